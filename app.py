@@ -1,7 +1,6 @@
 try:
-    from fastapi import FastAPI, File, UploadFile, WebSocket, WebSocketDisconnect, Request
-    from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse
-    from fastapi.staticfiles import StaticFiles
+    from fastapi import FastAPI, File, UploadFile, WebSocket, WebSocketDisconnect, Request, Body
+    from fastapi.responses import HTMLResponse, JSONResponse, Response, StreamingResponse
     from fastapi.templating import Jinja2Templates
 except ImportError as e:
     raise ImportError(
@@ -13,8 +12,6 @@ except ImportError as e:
     ) from e
 import cv2
 import numpy as np
-import torch
-from ultralytics import YOLO
 import base64
 import json
 import asyncio
@@ -26,21 +23,68 @@ from typing import List
 import uvicorn
 import threading
 import time
+import uuid
 from pathlib import Path
 
+from assets import AssetPipeline, StaticAsset, ThumbnailCache, build_response
+from cascade import CascadeDetector, create_cascade
+from config import (MODEL_PATH, INPUT_SIZE, DETECTION_MODES, EXPORTS_DIR, EXPORT_RETENTION_HOURS,
+                    EXPORT_MAX_FILES, LIVE_FRAME_DEADLINE_MS, LIVE_TARGET_FPS, VIDEO_TARGET_FPS, VIDEO_PROCESSING_SPEED, SAMPLING_STRATEGIES,
+                    VIRTUAL_CAMERA_MAX_FEEDS)
+from detector import Detector
+from frame_source import FrameSource, scale_detections
+from metrics import training_metrics
+from roi import roi_manager
+from virtual_camera import VirtualCapture, resolve_source
+from sampling import AdaptiveSampler, SceneChangeSampler, frame_signature
+from scheduler import scheduler, DeadlineMissed, LIVE, INTERACTIVE, BATCH
+from video_export import AnnotatedVideoExporter, prune_exports
+
 app = FastAPI(title="AI Sniper Detection System", version="1.0.0")
 
-# Mount static files and templates
-app.mount("/static", StaticFiles(directory="static"), name="static")
+# Precompressed, fingerprinted static files and templates
+static_assets = AssetPipeline("static", url_prefix="/static").build()
+thumbnails = ThumbnailCache(".")
 templates = Jinja2Templates(directory="templates")
+templates.env.globals["asset_url"] = static_assets.url
+
+def asset_response(response):
+    """Convert an asset pipeline response into a FastAPI response"""
+    if not isinstance(response.body, (bytes, bytearray, memoryview)):
+        return StreamingResponse(response.body, status_code=response.status, headers=response.headers)
+    return Response(content=bytes(response.body), status_code=response.status, headers=response.headers)
+
+def json_with_data_url(payload, key, mime_type, data):
+    """JSON response with an extra base64 data-URL field, built without a base64 str copy"""
+    head = json.dumps(payload).encode()[:-1]
+    separator = b', ' if len(head) > 1 else b''
+    body = b''.join([
+        head, separator, b'"', key.encode(), b'": "data:', mime_type.encode(), b';base64,',
+        base64.b64encode(data), b'"}'
+    ])
+    return Response(content=body, media_type="application/json")
 
 # Load the trained model
-model = YOLO("my_model.pt")
+detector = Detector(MODEL_PATH)
+detector.load()
+
+# Shared cascade for live and image requests; video jobs get their own for per-job counts
+cascade_detector = create_cascade(detector)
+
+def get_detector(mode):
+    """Detector implementing the requested detection mode"""
+    if mode not in DETECTION_MODES:
+        raise ValueError(f"Unknown detection mode '{mode}', expected one of: {', '.join(DETECTION_MODES)}")
+    return cascade_detector if mode == "cascade" else detector
 
 # Store active connections for real-time updates
 class ConnectionManager:
     def __init__(self):
         self.active_connections: List[WebSocket] = []
+        self.broadcasts = 0
+        self.messages_sent = 0
+        self.bytes_sent = 0
+        self.send_failures = 0
 
     async def connect(self, websocket: WebSocket):
         await websocket.accept()
@@ -53,93 +97,197 @@ class ConnectionManager:
         await websocket.send_text(message)
 
     async def broadcast(self, message: str):
+        self.broadcasts += 1
         for connection in self.active_connections:
             try:
                 await connection.send_text(message)
+                self.messages_sent += 1
+                self.bytes_sent += len(message)
             except:
-                pass
+                self.send_failures += 1
+
+    def stats(self):
+        """Broadcast fan-out counters"""
+        return {
+            "connections": len(self.active_connections),
+            "broadcasts": self.broadcasts,
+            "messages_sent": self.messages_sent,
+            "bytes_sent": self.bytes_sent,
+            "send_failures": self.send_failures
+        }
 
 manager = ConnectionManager()
 
 # Camera management
+class CameraFeed:
+    """One capture device or virtual camera with its decoder, sampler and counters"""
+
+    def __init__(self, camera_id, camera, mode="standard", max_queue_size=2):
+        self.camera_id = camera_id
+        self.camera = camera
+        self.mode = mode
+        # Decode on a background thread so capture overlaps inference
+        self.frame_source = FrameSource(camera, queue_size=max_queue_size, live=True).start()
+        # Paces the stream loop to what inference on this machine sustains
+        self.sampler = AdaptiveSampler(camera.get(cv2.CAP_PROP_FPS) or 30, LIVE_TARGET_FPS)
+        self.frames_streamed = 0
+        self.jpeg_bytes = 0
+        self.is_streaming = True
+
+    def stop(self):
+        """Stop decoding and release the capture"""
+        self.is_streaming = False
+        self.frame_source.stop()
+        self.camera.release()
+
+    def get_frame(self, timeout=1.0):
+        """Get current frame from camera as a DecodedFrame; release() it when done"""
+        return self.frame_source.read(timeout=timeout)
+
+    def record_inference(self, latency, detections):
+        """Feed one frame's inference time to the sampler and apply the chosen rate"""
+        self.sampler.record(latency, detections, scheduler.queue_depth(LIVE))
+        # Frames that would not be inferred are only grabbed, never decoded
+        self.frame_source.sample_rate = self.sampler.interval
+
+    def record_drop(self):
+        """Count a frame dropped at its deadline as backlog, not as an inference sample"""
+        self.sampler.record_drop(scheduler.queue_depth(LIVE))
+        self.frame_source.sample_rate = self.sampler.interval
+
+    def record_streamed_frame(self, jpeg_buffer):
+        """Count the JPEG buffer allocated for one streamed frame"""
+        self.frames_streamed += 1
+        self.jpeg_bytes += jpeg_buffer.nbytes
+
+    def buffer_stats(self):
+        """Frame allocations per streamed frame, to confirm pooling keeps GC churn low"""
+        pool = self.frame_source.pool.stats()
+        frames = max(self.frames_streamed, 1)
+        # Each streamed frame allocates exactly one JPEG buffer in imencode
+        allocations = pool.get("allocations", 0) + self.frames_streamed
+        allocated_bytes = pool.get("bytes_allocated", 0) + self.jpeg_bytes
+        return {
+            "frames_streamed": self.frames_streamed,
+            "allocations_per_frame": round(allocations / frames, 3),
+            "bytes_allocated_per_frame": round(allocated_bytes / frames),
+            "jpeg_bytes_per_frame": round(self.jpeg_bytes / frames),
+            "pool": pool
+        }
+
+    def process_frame_with_detection(self, frame, in_place=False, **kwargs):
+        """Process frame with AI detection, annotating frame itself if in_place"""
+        try:
+            # Run detection, restricted to the camera's regions of interest if configured
+            active_detector = get_detector(self.mode)
+            roi = roi_manager.get(self.camera_id)
+            if roi is not None:
+                annotated_frame, detections = roi.detect(active_detector, frame, in_place=in_place, **kwargs)
+            else:
+                annotated_frame, detections = active_detector.detect(frame, in_place=in_place, **kwargs)
+            
+            return annotated_frame, detections
+        except Exception as e:
+            print(f"Detection error: {e}")
+            return frame, []
+
+    def status(self):
+        return {
+            "camera_id": self.camera_id,
+            "is_streaming": self.is_streaming,
+            "mode": self.mode,
+            "camera_available": self.camera.isOpened(),
+            "pipeline": self.frame_source.stats(),
+            "buffers": self.buffer_stats(),
+            "sampling": self.sampler.stats(),
+            "capture": self.camera.stats() if isinstance(self.camera, VirtualCapture) else None
+        }
+
 class CameraManager:
+    """The running camera feeds: one capture device, or a set of virtual cameras"""
+
     def __init__(self):
-        self.camera = None
-        self.is_streaming = False
-        self.detection_thread = None
-        self.frame_queue = []
-        self.max_queue_size = 30
-        
-    def start_camera(self, camera_id=0):
+        self.feeds = {}
+        self.camera_modes = {}
+        self.max_queue_size = 2
+
+    @property
+    def is_streaming(self):
+        return any(feed.is_streaming for feed in self.feeds.values())
+
+    def feed(self, camera_id=None):
+        """Feed for camera_id, or the first started feed if camera_id is None"""
+        if camera_id is None:
+            return next(iter(self.feeds.values()), None)
+        return self.feeds.get(str(camera_id))
+
+    def _add_feed(self, camera_id, camera, mode):
+        camera_id = str(camera_id)
+        if mode is not None:
+            self.camera_modes[camera_id] = mode
+        self.feeds[camera_id] = CameraFeed(camera_id, camera, self.camera_modes.get(camera_id, "standard"),
+                                           self.max_queue_size)
+
+    def start_camera(self, camera_id=0, mode=None):
         """Start camera capture"""
         try:
-            self.camera = cv2.VideoCapture(camera_id)
-            if not self.camera.isOpened():
+            # Release any previous cameras and decoders before switching devices
+            self.stop_camera()
+            camera = cv2.VideoCapture(camera_id)
+            if not camera.isOpened():
                 return False
             
             # Set camera properties for better performance
-            self.camera.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-            self.camera.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-            self.camera.set(cv2.CAP_PROP_FPS, 30)
+            camera.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
+            camera.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
+            camera.set(cv2.CAP_PROP_FPS, 30)
             
-            self.is_streaming = True
+            self._add_feed(camera_id, camera, mode)
             return True
         except Exception as e:
             print(f"Error starting camera: {e}")
             return False
-    
-    def stop_camera(self):
-        """Stop camera capture"""
-        self.is_streaming = False
-        if self.camera:
-            self.camera.release()
-            self.camera = None
-    
-    def get_frame(self):
-        """Get current frame from camera"""
-        if self.camera and self.camera.isOpened():
-            ret, frame = self.camera.read()
-            if ret:
-                return frame
-        return None
-    
-    def process_frame_with_detection(self, frame):
-        """Process frame with AI detection"""
+
+    def start_virtual(self, source, feeds=1, mode=None, fps=None, speed=1.0, jitter_ms=0.0, drop_rate=0.0):
+        """Replay source as feeds independent cameras named virtual-0, virtual-1, ...
+
+        Raises ValueError if the source cannot be opened.
+        """
+        self.stop_camera()
+        path = resolve_source(source)
         try:
-            # Run detection
-            results = model(frame)
-            
-            # Process results
-            detections = []
-            annotated_frame = frame.copy()
-            
-            for result in results:
-                boxes = result.boxes
-                if boxes is not None:
-                    for box in boxes:
-                        # Get coordinates and confidence
-                        x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                        confidence = box.conf[0].cpu().numpy()
-                        class_id = int(box.cls[0].cpu().numpy())
-                        
-                        # Only show detections above threshold
-                        if confidence > 0.3:
-                            detections.append({
-                                "bbox": [int(x1), int(y1), int(x2), int(y2)],
-                                "confidence": float(confidence),
-                                "class": "sniper"
-                            })
-                            
-                            # Draw bounding box
-                            color = (0, 0, 255) if confidence > 0.7 else (0, 255, 255)
-                            cv2.rectangle(annotated_frame, (int(x1), int(y1)), (int(x2), int(y2)), color, 2)
-                            cv2.putText(annotated_frame, f'Sniper: {confidence:.2f}', 
-                                      (int(x1), int(y1)-10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
-            
-            return annotated_frame, detections
-        except Exception as e:
-            print(f"Detection error: {e}")
-            return frame, []
+            for i in range(feeds):
+                # Staggered start positions and seeds keep the feeds from being identical
+                camera = VirtualCapture(path, fps=fps, speed=speed, jitter_ms=jitter_ms, drop_rate=drop_rate,
+                                        start_fraction=i / feeds, seed=i)
+                self._add_feed(f"virtual-{i}", camera, mode)
+        except Exception:
+            self.stop_camera()
+            raise
+        return list(self.feeds)
+
+    def stop_camera(self):
+        """Stop every camera feed"""
+        feeds, self.feeds = self.feeds, {}
+        for feed in feeds.values():
+            feed.stop()
+
+    @property
+    def mode(self):
+        """Detection mode of the first active camera"""
+        feed = self.feed()
+        return feed.mode if feed else "standard"
+
+    def stats(self):
+        """Totals across feeds, for measuring how the live pipeline scales"""
+        feeds = list(self.feeds.values())
+        return {
+            "feeds": len(feeds),
+            "frames_streamed": sum(feed.frames_streamed for feed in feeds),
+            "frames_decoded": sum(feed.frame_source.frames_decoded for feed in feeds),
+            "frames_dropped": sum(feed.frame_source.frames_dropped for feed in feeds),
+            "sampling_fps": round(sum(feed.sampler.rate for feed in feeds), 2)
+        }
 
 camera_manager = CameraManager()
 
@@ -156,44 +304,54 @@ async def dashboard(request: Request):
     """Main dashboard page"""
     return templates.TemplateResponse("dashboard.html", {"request": request})
 
+# Plain def so FastAPI runs these in its thread pool: a changed asset is recompressed,
+# and a thumbnail resized and WebP-encoded, inside respond()
+@app.get("/static/{path:path}")
+def static_file(path: str, request: Request, v: str = None):
+    """Serve a precompressed static asset"""
+    response = static_assets.respond(path, v, request.headers)
+    if response is None:
+        return JSONResponse(status_code=404, content={"error": "Not found"})
+    return asset_response(response)
+
+@app.get("/thumbnails/{name}")
+def thumbnail(name: str, request: Request, w: int = None, v: str = None):
+    """Serve a downscaled WebP preview of a training plot image"""
+    try:
+        response = thumbnails.respond(name, w, v, request.headers)
+    except Exception as e:
+        return JSONResponse(status_code=500, content={"error": f"Thumbnail failed: {str(e)}"})
+    if response is None:
+        return JSONResponse(status_code=404, content={"error": "Not found"})
+    return asset_response(response)
+
 @app.post("/detect/image")
-async def detect_image(file: UploadFile = File(...)):
-    """Detect snipers in uploaded image"""
+async def detect_image(file: UploadFile = File(...), mode: str = "standard", deadline_ms: int = None):
+    """Detect snipers in uploaded image, optionally giving up if inference cannot start within deadline_ms"""
+    received_at = time.perf_counter()
+    try:
+        active_detector = get_detector(mode)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
     try:
-        # Read image
+        # Read image (frombuffer wraps the upload without copying it)
         contents = await file.read()
         nparr = np.frombuffer(contents, np.uint8)
         image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
         
-        # Run detection
-        results = model(image)
-        
-        # Process results
-        detections = []
-        annotated_image = image.copy()
+        if image is None:
+            return JSONResponse(
+                status_code=400,
+                content={"error": "Could not decode image"}
+            )
         
-        for result in results:
-            boxes = result.boxes
-            if boxes is not None:
-                for box in boxes:
-                    # Get coordinates and confidence
-                    x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                    confidence = box.conf[0].cpu().numpy()
-                    class_id = int(box.cls[0].cpu().numpy())
-                    
-                    # Only show detections above threshold
-                    if confidence > 0.3:
-                        detections.append({
-                            "bbox": [int(x1), int(y1), int(x2), int(y2)],
-                            "confidence": float(confidence),
-                            "class": "sniper"
-                        })
-                        
-                        # Draw bounding box
-                        color = (0, 0, 255) if confidence > 0.7 else (0, 255, 255)
-                        cv2.rectangle(annotated_image, (int(x1), int(y1)), (int(x2), int(y2)), color, 2)
-                        cv2.putText(annotated_image, f'Sniper: {confidence:.2f}', 
-                                  (int(x1), int(y1)-10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
+        # Run detection as interactive work, annotating the decoded image directly since it is not reused
+        deadline = received_at + deadline_ms / 1000 if deadline_ms is not None else None
+        try:
+            annotated_image, detections = await scheduler.run_async(
+                INTERACTIVE, active_detector.detect, image, in_place=True, deadline=deadline)
+        except DeadlineMissed as e:
+            return JSONResponse(status_code=503, content={"error": str(e)})
         
         # Update statistics
         detection_stats["total_detections"] += len(detections)
@@ -209,9 +367,8 @@ async def detect_image(file: UploadFile = File(...)):
         else:
             detection_stats["threat_level"] = "LOW"
         
-        # Convert annotated image to base64
+        # Encode annotated image as JPEG
         _, buffer = cv2.imencode('.jpg', annotated_image)
-        img_base64 = base64.b64encode(buffer).decode('utf-8')
         
         # Broadcast to connected clients
         await manager.broadcast(json.dumps({
@@ -221,11 +378,11 @@ async def detect_image(file: UploadFile = File(...)):
             "timestamp": datetime.now().isoformat()
         }))
         
-        return {
+        return json_with_data_url({
             "detections": detections,
-            "annotated_image": f"data:image/jpeg;base64,{img_base64}",
+            "mode": mode,
             "stats": detection_stats
-        }
+        }, "annotated_image", "image/jpeg", buffer)
         
     except Exception as e:
         return JSONResponse(
@@ -258,9 +415,49 @@ async def get_model_info():
         "classes": ["sniper"],
         "input_size": 640,
         "confidence_threshold": 0.3,
-        "nms_threshold": 0.7
+        "nms_threshold": 0.7,
+        "detection_modes": list(DETECTION_MODES)
     }
 
+@app.get("/api/metrics")
+async def get_metrics():
+    """Get metrics for the latest training epoch"""
+    try:
+        return training_metrics.latest()
+    except (FileNotFoundError, LookupError):
+        return JSONResponse(status_code=404, content={"error": "No metrics found"})
+
+@app.get("/api/metrics/curves")
+async def get_metric_curves(metrics: str = "", points: int = None):
+    """Get per-epoch training curves, optionally downsampled to `points` entries"""
+    try:
+        names = [name for name in metrics.split(",") if name]
+        return training_metrics.curves(names, points)
+    except (KeyError, ValueError) as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+    except FileNotFoundError:
+        return JSONResponse(status_code=404, content={"error": "No metrics found"})
+
+@app.get("/api/metrics/best")
+async def get_best_epoch(metric: str = "mAP50_95"):
+    """Get a summary of the best training epoch"""
+    try:
+        return training_metrics.best(metric)
+    except (KeyError, ValueError) as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+    except (FileNotFoundError, LookupError):
+        return JSONResponse(status_code=404, content={"error": "No metrics found"})
+
+@app.get("/api/cascade")
+async def get_cascade_stats():
+    """Get screen and verify counts of the shared cascade used by live and image detection"""
+    return cascade_detector.stats()
+
+@app.get("/api/scheduler")
+async def get_scheduler_stats():
+    """Get per-class inference latency and shed counts"""
+    return scheduler.stats()
+
 @app.post("/api/reset-stats")
 async def reset_stats():
     """Reset detection statistics"""
@@ -273,11 +470,52 @@ async def reset_stats():
     }
     return {"message": "Statistics reset successfully"}
 
+@app.get("/api/roi")
+async def get_all_roi():
+    """Get region-of-interest configuration for every camera"""
+    return roi_manager.to_dict()
+
+@app.get("/api/roi/{camera_id}")
+async def get_roi(camera_id: str):
+    """Get region-of-interest configuration and usage for a camera"""
+    roi = roi_manager.get(camera_id)
+    if roi is None:
+        return JSONResponse(status_code=404, content={"error": f"No ROI configured for camera {camera_id}"})
+    return {**roi.to_dict(), "stats": roi.stats()}
+
+@app.put("/api/roi/{camera_id}")
+async def set_roi(camera_id: str, config: dict = Body(...)):
+    """Set region polygons and exclusion zones for a camera"""
+    try:
+        roi = roi_manager.set(camera_id, config)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+    return {"success": True, "camera_id": camera_id, **roi.to_dict()}
+
+@app.delete("/api/roi/{camera_id}")
+async def delete_roi(camera_id: str):
+    """Remove a camera's ROI configuration so it infers full frames again"""
+    if not roi_manager.remove(camera_id):
+        return JSONResponse(status_code=404, content={"error": f"No ROI configured for camera {camera_id}"})
+    return {"success": True, "message": f"ROI for camera {camera_id} removed"}
+
 @app.post("/camera/start")
-async def start_camera(camera_id: int = 0):
-    """Start camera for live detection"""
+async def start_camera(camera_id: int = 0, mode: str = None, virtual: str = None, feeds: int = 1,
+                       fps: float = None, speed: float = 1.0, jitter_ms: float = 0.0, drop_rate: float = 0.0):
+    """Start camera for live detection, optionally choosing its detection mode
+
+    With virtual set to a video file or image folder, that source is replayed as
+    feeds independent virtual cameras instead of opening a device.
+    """
+    if mode is not None and mode not in DETECTION_MODES:
+        return JSONResponse(
+            status_code=400,
+            content={"success": False, "message": f"Unknown detection mode '{mode}'"}
+        )
+    if virtual is not None:
+        return await start_virtual_cameras(virtual, feeds, mode, fps, speed, jitter_ms, drop_rate)
     try:
-        success = camera_manager.start_camera(camera_id)
+        success = camera_manager.start_camera(camera_id, mode)
         if success:
             await manager.broadcast(json.dumps({
                 "type": "camera_status",
@@ -296,6 +534,36 @@ async def start_camera(camera_id: int = 0):
             content={"success": False, "message": f"Camera error: {str(e)}"}
         )
 
+async def start_virtual_cameras(source, feeds, mode, fps, speed, jitter_ms, drop_rate):
+    """Start virtual camera feeds replaying source"""
+    if not 1 <= feeds <= VIRTUAL_CAMERA_MAX_FEEDS:
+        return JSONResponse(
+            status_code=400,
+            content={"success": False, "message": f"feeds must be between 1 and {VIRTUAL_CAMERA_MAX_FEEDS}"}
+        )
+    if speed <= 0 or (fps is not None and fps <= 0) or jitter_ms < 0 or not 0 <= drop_rate < 1:
+        return JSONResponse(
+            status_code=400,
+            content={"success": False, "message": "speed and fps must be positive, jitter_ms non-negative "
+                                                  "and drop_rate in [0, 1)"}
+        )
+    try:
+        camera_ids = await asyncio.get_running_loop().run_in_executor(
+            None, lambda: camera_manager.start_virtual(source, feeds, mode, fps, speed, jitter_ms, drop_rate))
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"success": False, "message": str(e)})
+    except Exception as e:
+        return JSONResponse(
+            status_code=500,
+            content={"success": False, "message": f"Camera error: {str(e)}"}
+        )
+    await manager.broadcast(json.dumps({
+        "type": "camera_status",
+        "status": "started",
+        "message": f"{len(camera_ids)} virtual cameras started"
+    }))
+    return {"success": True, "message": f"{len(camera_ids)} virtual cameras started", "camera_ids": camera_ids}
+
 @app.post("/camera/stop")
 async def stop_camera():
     """Stop camera"""
@@ -313,66 +581,163 @@ async def stop_camera():
             content={"success": False, "message": f"Error stopping camera: {str(e)}"}
         )
 
+MJPEG_PART_HEADER = b'--frame\r\nContent-Type: image/jpeg\r\n\r\n'
+MJPEG_PART_TRAILER = b'\r\n'
+# How often a stream checks for the next frame when none is queued yet
+FRAME_POLL_INTERVAL = 0.005
+JPEG_STREAM_PARAMS = [cv2.IMWRITE_JPEG_QUALITY, 85]
+
 @app.get("/camera/stream")
-async def camera_stream():
-    """Stream camera feed with real-time detection"""
-    def generate_frames():
-        while camera_manager.is_streaming:
-            frame = camera_manager.get_frame()
-            if frame is not None:
-                # Process frame with detection
-                annotated_frame, detections = camera_manager.process_frame_with_detection(frame)
-                
-                # Update statistics if detections found
-                if detections:
-                    global detection_stats
-                    detection_stats["total_detections"] += len(detections)
-                    high_conf_detections = [d for d in detections if d["confidence"] > 0.7]
-                    detection_stats["high_confidence_detections"] += len(high_conf_detections)
-                    detection_stats["last_detection"] = datetime.now().isoformat()
-                    
-                    # Determine threat level
-                    if high_conf_detections:
-                        detection_stats["threat_level"] = "HIGH"
-                    elif detections:
-                        detection_stats["threat_level"] = "MEDIUM"
-                    
-                    # Broadcast detection update (non-blocking)
-                    try:
-                        asyncio.create_task(manager.broadcast(json.dumps({
-                            "type": "live_detection",
-                            "detections": detections,
-                            "stats": detection_stats,
-                            "timestamp": datetime.now().isoformat()
-                        })))
-                    except:
-                        pass  # Ignore broadcast errors during streaming
+async def camera_stream(camera_id: str = None):
+    """Stream camera feed with real-time detection, the first feed unless camera_id is given"""
+    feed = camera_manager.feed(camera_id)
+    if feed is None:
+        return JSONResponse(status_code=404, content={"error": "Camera not started"})
+    loop = asyncio.get_running_loop()
+
+    # An async generator holds no worker thread while it waits, so open streams are not
+    # capped by the thread pool; only inference and JPEG encoding run off the event loop
+    async def generate_frames():
+        sampler = feed.sampler
+        while feed.is_streaming:
+            iteration_start = time.perf_counter()
+            decoded = feed.get_frame(timeout=0)
+            if decoded is None:
+                await asyncio.sleep(FRAME_POLL_INTERVAL)
+                continue
+            # Process frame with detection as live work, drawing straight onto the pooled buffer.
+            # A frame that cannot start inference before its deadline is dropped, not sent late.
+            inference_start = time.perf_counter()
+            try:
+                annotated_frame, detections = await scheduler.run_async(
+                    LIVE, feed.process_frame_with_detection, decoded.image, in_place=True,
+                    deadline=decoded.decoded_at + LIVE_FRAME_DEADLINE_MS / 1000, **sampler.inference_kwargs())
+            except DeadlineMissed:
+                decoded.release()
+                feed.record_drop()
+                continue
+            feed.record_inference(time.perf_counter() - inference_start, len(detections))
+            
+            # Update statistics if detections found
+            if detections:
+                global detection_stats
+                detection_stats["total_detections"] += len(detections)
+                high_conf_detections = [d for d in detections if d["confidence"] > 0.7]
+                detection_stats["high_confidence_detections"] += len(high_conf_detections)
+                detection_stats["last_detection"] = datetime.now().isoformat()
                 
-                # Encode frame as JPEG
-                _, buffer = cv2.imencode('.jpg', annotated_frame, [cv2.IMWRITE_JPEG_QUALITY, 85])
-                frame_bytes = buffer.tobytes()
+                # Determine threat level
+                if high_conf_detections:
+                    detection_stats["threat_level"] = "HIGH"
+                elif detections:
+                    detection_stats["threat_level"] = "MEDIUM"
                 
-                yield (b'--frame\r\n'
-                       b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
+                # Broadcast detection update (non-blocking)
+                try:
+                    asyncio.create_task(manager.broadcast(json.dumps({
+                        "type": "live_detection",
+                        "camera_id": feed.camera_id,
+                        "detections": detections,
+                        "stats": detection_stats,
+                        "timestamp": datetime.now().isoformat()
+                    })))
+                except:
+                    pass  # Ignore broadcast errors during streaming
             
-            time.sleep(0.033)  # ~30 FPS
+            # Encode frame as JPEG off the event loop, then hand the frame buffer back to the decoder.
+            # A client that disconnects mid-frame leaves its buffer to the garbage collector instead,
+            # since inference or encoding may still be using it.
+            _, buffer = await loop.run_in_executor(
+                None, cv2.imencode, '.jpg', annotated_frame, JPEG_STREAM_PARAMS)
+            decoded.release()
+            feed.record_streamed_frame(buffer)
+            
+            # Starlette 0.27 only passes bytes chunks through, so join the part in one copy
+            yield b''.join((MJPEG_PART_HEADER, buffer, MJPEG_PART_TRAILER))
+            
+            # Wait out the rest of the sampling interval the controller chose
+            await asyncio.sleep(sampler.delay(time.perf_counter() - iteration_start))
     
     return StreamingResponse(generate_frames(), media_type="multipart/x-mixed-replace; boundary=frame")
 
 @app.get("/camera/status")
-async def camera_status():
-    """Get camera status"""
-    return {
-        "is_streaming": camera_manager.is_streaming,
-        "camera_available": camera_manager.camera is not None and camera_manager.camera.isOpened() if camera_manager.camera else False
+async def camera_status(camera_id: str = None):
+    """Get camera status of the first feed or camera_id, with totals across all feeds"""
+    feed = camera_manager.feed(camera_id)
+    if feed is None and camera_id is not None:
+        return JSONResponse(status_code=404, content={"error": f"Camera {camera_id} is not running"})
+    status = feed.status() if feed else {
+        "mode": camera_manager.mode,
+        "camera_available": False,
+        "pipeline": None,
+        "buffers": None,
+        "sampling": None
     }
+    status["is_streaming"] = camera_manager.is_streaming
+    status["camera_ids"] = list(camera_manager.feeds)
+    status["totals"] = camera_manager.stats()
+    status["websocket"] = manager.stats()
+    return status
+
+@app.get("/exports/{name}")
+async def download_export(name: str, request: Request):
+    """Download an annotated video export, with byte ranges for seeking"""
+    path = EXPORTS_DIR / os.path.basename(name)
+    if path.suffix != ".mp4" or not path.is_file():
+        return JSONResponse(status_code=404, content={"error": "Export not found"})
+    asset = StaticAsset.from_path(str(path), "video/mp4")
+    return asset_response(build_response(asset, None, request.headers))
+
+def process_video_frames(source, active_detector, fps, sampler, exporter=None):
+    """Detect on every frame of source the sampler selects, as batch work, one frame per scheduler job"""
+    all_detections = []
+    for frame in source:
+        strategy = sampler.select(frame)
+        if strategy is None:
+            # Unselected frame, decoded only for the export or its signature; export boxes are interpolated
+            if exporter:
+                exporter.submit(frame)
+            else:
+                frame.release()
+            continue
+        
+        # Run detection on this frame; live and interactive work overtakes between frames
+        start = time.perf_counter()
+        _, frame_detections = scheduler.run(
+            BATCH, active_detector.detect, frame.image, annotate=False, **sampler.inference_kwargs())
+        sampler.record(time.perf_counter() - start, len(frame_detections), scheduler.queue_depth(BATCH))
+        if not exporter:
+            # Apply the chosen interval in the decoder; exports need every frame decoded anyway
+            source.sample_rate = sampler.decode_interval
+        scale_detections(frame_detections, frame.scale)
+        for detection in frame_detections:
+            detection["frame"] = frame.index
+            detection["timestamp"] = frame.index / fps
+            detection["sampling"] = strategy
+        
+        if exporter:
+            exporter.submit(frame, frame_detections)
+        else:
+            frame.release()
+        
+        if frame_detections:
+            all_detections.extend(frame_detections)
+    return all_detections
 
 @app.post("/detect/video")
-async def detect_video(file: UploadFile = File(...)):
-    """Process uploaded video file for sniper detection"""
+async def detect_video(file: UploadFile = File(...), mode: str = "standard", export: bool = False,
+                       sampling: str = "interval"):
+    """Process uploaded video file for sniper detection, optionally exporting an annotated copy"""
+    if mode not in DETECTION_MODES:
+        return JSONResponse(status_code=400, content={"error": f"Unknown detection mode '{mode}'"})
+    if sampling not in SAMPLING_STRATEGIES:
+        return JSONResponse(status_code=400, content={"error": f"Unknown sampling strategy '{sampling}'"})
+    # A per-job cascade keeps the screen/verify counts of this video separate
+    active_detector = CascadeDetector(detector, cascade_detector.screen_detector) if mode == "cascade" else detector
     try:
         # Save uploaded video temporarily
-        temp_video_path = f"temp_video_{int(time.time())}.mp4"
+        # Concurrent uploads run at once, so each needs a name of its own
+        temp_video_path = f"temp_video_{uuid.uuid4().hex}.mp4"
         
         with open(temp_video_path, "wb") as buffer:
             content = await file.read()
@@ -393,41 +758,38 @@ async def detect_video(file: UploadFile = File(...)):
         frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
         duration = frame_count / fps if fps > 0 else 0
         
-        # Process frames (sample every 30 frames for efficiency)
-        all_detections = []
-        frame_number = 0
-        sample_rate = max(1, fps // 2)  # Sample 2 frames per second
+        if sampling == "scene":
+            # Infer only when the picture changes, at least every SCENE_MAX_GAP_SECONDS
+            sampler = SceneChangeSampler(fps)
+            signature = frame_signature
+        else:
+            # Sampling interval adapts to detection activity and to what inference keeps up with
+            sampler = AdaptiveSampler(fps, VIDEO_TARGET_FPS, speed=VIDEO_PROCESSING_SPEED)
+            signature = None
         
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                break
-            
-            if frame_number % sample_rate == 0:
-                # Run detection on this frame
-                results = model(frame)
-                
-                frame_detections = []
-                for result in results:
-                    boxes = result.boxes
-                    if boxes is not None:
-                        for box in boxes:
-                            x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                            confidence = box.conf[0].cpu().numpy()
-                            
-                            if confidence > 0.3:
-                                frame_detections.append({
-                                    "frame": frame_number,
-                                    "timestamp": frame_number / fps,
-                                    "bbox": [int(x1), int(y1), int(x2), int(y2)],
-                                    "confidence": float(confidence),
-                                    "class": "sniper"
-                                })
-                
-                if frame_detections:
-                    all_detections.extend(frame_detections)
-            
-            frame_number += 1
+        exporter = None
+        export_info = None
+        if export:
+            # Make room for this export under the retention limits
+            prune_exports(EXPORTS_DIR, EXPORT_RETENTION_HOURS, EXPORT_MAX_FILES - 1)
+            export_path = EXPORTS_DIR / f"annotated_{uuid.uuid4().hex[:12]}.mp4"
+            exporter = AnnotatedVideoExporter(str(export_path), fps)
+            # The export needs every frame at full size; only sampled frames are inferred.
+            # The pool covers the exporter's frames in flight plus the decoder's own queue.
+            source = FrameSource(cap, pool_size=exporter.max_frames + 10, signature=signature).start()
+        else:
+            # Decode and downscale to the model input size while the previous frame is inferred
+            source = FrameSource(cap, resize_to=INPUT_SIZE, sample_rate=sampler.decode_interval,
+                                 signature=signature).start()
+        try:
+            # Run off the event loop so other requests are served while the video is processed
+            all_detections = await asyncio.get_running_loop().run_in_executor(
+                None, process_video_frames, source, active_detector, fps, sampler, exporter)
+        finally:
+            source.stop()
+            if exporter:
+                export_info = await asyncio.get_running_loop().run_in_executor(None, exporter.close)
+                export_info["url"] = f"/exports/{export_info['file']}"
         
         cap.release()
         os.remove(temp_video_path)
@@ -471,6 +833,11 @@ async def detect_video(file: UploadFile = File(...)):
                 "total_detections": len(all_detections),
                 "high_confidence_detections": len(high_conf_detections)
             },
+            "pipeline": source.stats(),
+            "sampling": sampler.stats(),
+            "mode": mode,
+            "cascade": active_detector.stats() if mode == "cascade" else None,
+            "export": export_info,
             "stats": detection_stats
         }
         
@@ -478,6 +845,8 @@ async def detect_video(file: UploadFile = File(...)):
         # Clean up temp file if it exists
         if 'temp_video_path' in locals() and os.path.exists(temp_video_path):
             os.remove(temp_video_path)
+        if 'export_path' in locals() and export_path.exists():
+            export_path.unlink()
         
         return JSONResponse(
             status_code=500,
@@ -0,0 +1,373 @@
+"""
+Precompressed, fingerprinted static asset serving for the AI Sniper Detection System
+"""
+
+import gzip
+import hashlib
+import io
+import mimetypes
+import os
+import re
+import threading
+import time
+from email.utils import formatdate
+
+try:
+    import brotli
+except ImportError:
+    # Brotli is optional; gzip variants are always built
+    brotli = None
+
+SERVED_EXTENSIONS = {'.html', '.css', '.js', '.svg', '.json', '.csv',
+                     '.png', '.jpg', '.jpeg', '.gif', '.webp', '.ico'}
+COMPRESSIBLE_EXTENSIONS = {'.html', '.css', '.js', '.svg', '.json', '.csv'}
+IMAGE_EXTENSIONS = {'.png', '.jpg', '.jpeg'}
+MIN_COMPRESS_SIZE = 1024
+IMMUTABLE_CACHE = 'public, max-age=31536000, immutable'
+REVALIDATE_CACHE = 'no-cache'
+THUMBNAIL_WIDTHS = (160, 320, 640)
+THUMBNAIL_QUALITY = 80
+STREAM_CHUNK_SIZE = 256 * 1024
+
+# href/src attributes pointing at local files
+ASSET_REF_PATTERN = re.compile(r'(\b(?:href|src)=")([^"?#:]+)(")')
+
+
+class StaticAsset:
+    """A static file with its content fingerprint and precompressed variants"""
+
+    def __init__(self, data, content_type, mtime, path=None, compress=False):
+        self.path = path
+        self.content_type = content_type
+        self.mtime = mtime
+        self.size = len(data)
+        self.fingerprint = hashlib.sha1(data).hexdigest()[:12]
+        self.variants = {}
+        # Large binary files are re-read from disk per request instead of held in memory
+        self.data = data if compress or path is None else None
+        if compress and self.size >= MIN_COMPRESS_SIZE:
+            compressed = gzip.compress(data, compresslevel=9, mtime=0)
+            if len(compressed) < self.size:
+                self.variants['gzip'] = compressed
+            if brotli is not None:
+                compressed = brotli.compress(data, quality=11)
+                if len(compressed) < self.size:
+                    self.variants['br'] = compressed
+
+    @classmethod
+    def from_path(cls, path, content_type):
+        """Large file served from disk, fingerprinted by size and mtime instead of content"""
+        stat = os.stat(path)
+        asset = cls.__new__(cls)
+        asset.path = path
+        asset.content_type = content_type
+        asset.mtime = stat.st_mtime
+        asset.size = stat.st_size
+        asset.fingerprint = hashlib.sha1(f"{path}:{stat.st_size}:{stat.st_mtime_ns}".encode()).hexdigest()[:12]
+        asset.variants = {}
+        asset.data = None
+        return asset
+
+    def iter_range(self, start, end, chunk_size=STREAM_CHUNK_SIZE):
+        """Yield bytes [start, end) from disk in chunks"""
+        with open(self.path, 'rb') as f:
+            f.seek(start)
+            remaining = end - start
+            while remaining > 0:
+                chunk = f.read(min(chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+
+    def read(self, start=0, end=None):
+        """Read bytes [start, end) of the uncompressed content"""
+        end = self.size if end is None else end
+        if self.data is not None:
+            return memoryview(self.data)[start:end]
+        with open(self.path, 'rb') as f:
+            f.seek(start)
+            return f.read(end - start)
+
+
+class AssetResponse:
+    """Framework-neutral response produced by the asset pipeline
+
+    body is bytes-like, or an iterator of chunks for files streamed from disk.
+    """
+
+    def __init__(self, status, headers, body=b''):
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+
+def choose_encoding(accept_encoding, variants):
+    """Pick the best precompressed variant the client accepts"""
+    accepted = set()
+    for token in (accept_encoding or '').split(','):
+        name, _, params = token.strip().partition(';')
+        if params.replace(' ', '') in ('q=0', 'q=0.0'):
+            continue
+        accepted.add(name.strip().lower())
+    for encoding in ('br', 'gzip'):
+        if encoding in variants and (encoding in accepted or '*' in accepted):
+            return encoding
+    return None
+
+
+def parse_range(range_header, size):
+    """Parse a single 'bytes=' range into (start, end) with end exclusive
+
+    Returns None when the header should be ignored and raises ValueError when
+    the range cannot be satisfied.
+    """
+    unit, _, spec = (range_header or '').partition('=')
+    if unit.strip().lower() != 'bytes' or ',' in spec:
+        return None
+    first, _, last = spec.strip().partition('-')
+    try:
+        if first:
+            start = int(first)
+            end = int(last) + 1 if last else size
+        elif last:
+            start = max(0, size - int(last))
+            end = size
+        else:
+            return None
+    except ValueError:
+        return None
+    end = min(end, size)
+    if start >= size or start >= end:
+        raise ValueError("Range not satisfiable")
+    return start, end
+
+
+def etag_matches(if_none_match, fingerprint):
+    """Weakly compare an If-None-Match header against an asset fingerprint"""
+    for tag in if_none_match.split(','):
+        tag = tag.strip()
+        if tag == '*':
+            return True
+        if tag.startswith('W/'):
+            tag = tag[2:]
+        if tag.strip('"').split('-')[0] == fingerprint:
+            return True
+    return False
+
+
+def build_response(asset, version, request_headers, head=False):
+    """Build the response for asset honouring caching, encoding and Range headers"""
+    range_header = request_headers.get('Range')
+    encoding = None if range_header else choose_encoding(
+        request_headers.get('Accept-Encoding'), asset.variants)
+    etag = f'"{asset.fingerprint}-{encoding}"' if encoding else f'"{asset.fingerprint}"'
+    headers = {
+        'ETag': etag,
+        'Cache-Control': IMMUTABLE_CACHE if version == asset.fingerprint else REVALIDATE_CACHE,
+        'Last-Modified': formatdate(asset.mtime, usegmt=True),
+        'Accept-Ranges': 'bytes'
+    }
+    if asset.variants:
+        headers['Vary'] = 'Accept-Encoding'
+
+    if_none_match = request_headers.get('If-None-Match')
+    if if_none_match and etag_matches(if_none_match, asset.fingerprint):
+        return AssetResponse(304, headers)
+
+    headers['Content-Type'] = asset.content_type
+    status = 200
+    start, end = 0, asset.size
+    if_range = request_headers.get('If-Range')
+    if range_header and (not if_range or etag_matches(if_range, asset.fingerprint)):
+        try:
+            byte_range = parse_range(range_header, asset.size)
+        except ValueError:
+            headers['Content-Range'] = f'bytes */{asset.size}'
+            headers['Content-Length'] = '0'
+            return AssetResponse(416, headers)
+        if byte_range is not None:
+            start, end = byte_range
+            status = 206
+            headers['Content-Range'] = f'bytes {start}-{end - 1}/{asset.size}'
+
+    if encoding:
+        headers['Content-Encoding'] = encoding
+        body = asset.variants[encoding]
+    elif head:
+        body = b''
+    elif asset.data is None and end - start > STREAM_CHUNK_SIZE:
+        body = asset.iter_range(start, end)
+    else:
+        body = asset.read(start, end)
+    headers['Content-Length'] = str(len(body) if encoding else end - start)
+    return AssetResponse(status, headers, b'' if head else body)
+
+
+class AssetPipeline:
+    """Load a directory of static files once and serve them with caching headers
+
+    Each request re-stats its file; an asset whose mtime changed is rebuilt, and
+    HTML pages are rewritten again so they reference the new fingerprint.
+    """
+
+    def __init__(self, root, url_prefix='', recursive=True):
+        self.root = root
+        self.url_prefix = url_prefix.rstrip('/')
+        self.recursive = recursive
+        self.assets = {}
+        self._lock = threading.Lock()
+
+    def _discover(self):
+        """List served files under root as paths relative to it"""
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            dirnames[:] = [d for d in dirnames if not d.startswith('.')] if self.recursive else []
+            for filename in filenames:
+                if os.path.splitext(filename)[1].lower() in SERVED_EXTENSIONS:
+                    path = os.path.join(dirpath, filename)
+                    yield os.path.relpath(path, self.root).replace(os.sep, '/')
+
+    def _load(self, rel_path, data=None):
+        """Create the StaticAsset for rel_path"""
+        path = os.path.join(self.root, rel_path)
+        if data is None:
+            with open(path, 'rb') as f:
+                data = f.read()
+        extension = os.path.splitext(rel_path)[1].lower()
+        content_type = mimetypes.guess_type(rel_path)[0] or 'application/octet-stream'
+        if content_type.startswith('text/') or extension in ('.js', '.svg', '.json'):
+            content_type += '; charset=utf-8'
+        return StaticAsset(data, content_type, os.stat(path).st_mtime, path=path,
+                           compress=extension in COMPRESSIBLE_EXTENSIONS)
+
+    def build(self):
+        """Fingerprint and precompress every asset, rewriting HTML references last"""
+        start = time.perf_counter()
+        paths = sorted(self._discover())
+        html = [p for p in paths if p.endswith('.html')]
+        for rel_path in paths:
+            if rel_path not in html:
+                self.assets[rel_path] = self._load(rel_path)
+        for rel_path in html:
+            self._load_html(rel_path)
+        compressed = sum(1 for asset in self.assets.values() if asset.variants)
+        print(f"Static assets: {len(self.assets)} files, {compressed} precompressed "
+              f"({'gzip+br' if brotli else 'gzip'}) in {time.perf_counter() - start:.2f}s")
+        return self
+
+    def _load_html(self, rel_path):
+        with open(os.path.join(self.root, rel_path), 'rb') as f:
+            text = f.read().decode('utf-8')
+        self.assets[rel_path] = self._load(rel_path, self.rewrite_html(text, rel_path).encode('utf-8'))
+
+    def _refresh(self, rel_path):
+        """Current asset for rel_path, rebuilt if its file changed and dropped if it was deleted"""
+        asset = self.assets.get(rel_path)
+        if asset is None:
+            return None
+        try:
+            mtime = os.stat(asset.path).st_mtime
+        except FileNotFoundError:
+            mtime = None
+        if mtime == asset.mtime:
+            return asset
+        with self._lock:
+            asset = self.assets.get(rel_path)
+            if asset is None or mtime == asset.mtime:
+                return asset
+            if mtime is None:
+                del self.assets[rel_path]
+                return None
+            if rel_path.endswith('.html'):
+                self._load_html(rel_path)
+            else:
+                self.assets[rel_path] = self._load(rel_path)
+                # Pages embed fingerprinted URLs, so they are rewritten against the new one
+                for page in [p for p in self.assets if p.endswith('.html')]:
+                    try:
+                        self._load_html(page)
+                    except FileNotFoundError:
+                        del self.assets[page]
+            return self.assets[rel_path]
+
+    def url(self, rel_path):
+        """Fingerprinted URL for rel_path, or the plain URL if it is unknown"""
+        rel_path = rel_path.lstrip('/')
+        asset = self.assets.get(rel_path)
+        plain = f"{self.url_prefix}/{rel_path}"
+        return f"{plain}?v={asset.fingerprint}" if asset else plain
+
+    def rewrite_html(self, text, rel_path):
+        """Point local href/src references in an HTML page at fingerprinted URLs"""
+        base = os.path.dirname(rel_path)
+
+        def replace(match):
+            ref = match.group(2)
+            if ref.startswith('//'):
+                return match.group(0)
+            if ref.startswith('/'):
+                if not ref.startswith(self.url_prefix + '/'):
+                    return match.group(0)
+                target = ref[len(self.url_prefix) + 1:]
+            else:
+                target = os.path.normpath(os.path.join(base, ref)).replace(os.sep, '/')
+            if target not in self.assets:
+                return match.group(0)
+            url = self.url(target)
+            if not ref.startswith('/'):
+                # Keep relative pages working when opened straight from disk
+                url = f"{ref}?v={self.assets[target].fingerprint}"
+            return match.group(1) + url + match.group(3)
+
+        return ASSET_REF_PATTERN.sub(replace, text)
+
+    def respond(self, rel_path, version, request_headers, head=False):
+        """Response for rel_path, or None if it is not a known asset"""
+        asset = self._refresh(rel_path.lstrip('/'))
+        if asset is None:
+            return None
+        return build_response(asset, version, request_headers, head)
+
+
+class ThumbnailCache:
+    """Downscaled WebP previews of the training plot images, built on first use"""
+
+    def __init__(self, directory, widths=THUMBNAIL_WIDTHS, quality=THUMBNAIL_QUALITY):
+        self.directory = directory
+        self.widths = widths
+        self.quality = quality
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def get(self, name, width=None):
+        """WebP StaticAsset for image name at the nearest allowed width, or None"""
+        name = os.path.basename(name)
+        if os.path.splitext(name)[1].lower() not in IMAGE_EXTENSIONS:
+            return None
+        path = os.path.join(self.directory, name)
+        if not os.path.isfile(path):
+            return None
+        width = next((w for w in self.widths if w >= (width or 0)), self.widths[-1])
+        mtime = os.stat(path).st_mtime
+        key = (name, width)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None and cached.mtime == mtime:
+                return cached
+            from PIL import Image
+            with Image.open(path) as image:
+                if image.mode not in ('RGB', 'RGBA'):
+                    image = image.convert('RGBA')
+                image.thumbnail((width, width * 4))
+                output = io.BytesIO()
+                image.save(output, 'WEBP', quality=self.quality, method=6)
+            asset = StaticAsset(output.getvalue(), 'image/webp', mtime)
+            self._cache[key] = asset
+            return asset
+
+    def respond(self, name, width, version, request_headers, head=False):
+        """Response for a thumbnail of name, or None if there is no such image"""
+        asset = self.get(name, width)
+        if asset is None:
+            return None
+        return build_response(asset, version, request_headers, head)
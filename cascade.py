@@ -0,0 +1,130 @@
+"""
+Two-stage cascaded inference: low-resolution screening, full-resolution verification
+"""
+
+import threading
+import time
+
+from config import (INPUT_SIZE, CONFIDENCE_THRESHOLD, CASCADE_SCREEN_SIZE,
+                    CASCADE_SCREEN_THRESHOLD, CASCADE_SCREEN_MODEL_PATH)
+from detector import Detector, draw_detections
+from roi import merge_rects
+
+# Context added around each candidate box, as a fraction of its larger side
+CANDIDATE_PADDING = 0.5
+MIN_VERIFY_CROP = INPUT_SIZE // 4
+
+
+class CascadeDetector:
+    """Screen frames at low resolution and re-score only candidate crops at full size
+
+    Exposes the same detect()/detect_batch() interface as Detector, so it can be
+    used anywhere a Detector is, including inside ROI crops.
+    """
+
+    def __init__(self, detector, screen_detector=None, screen_size=CASCADE_SCREEN_SIZE,
+                 screen_threshold=CASCADE_SCREEN_THRESHOLD, verify_size=INPUT_SIZE):
+        self.detector = detector
+        self.screen_detector = screen_detector or detector
+        self.screen_size = screen_size
+        self.screen_threshold = screen_threshold
+        self.verify_size = verify_size
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self):
+        with self._lock:
+            self.frames = 0
+            self.frames_screened_out = 0
+            self.candidates = 0
+            self.verified_crops = 0
+            self.confirmed = 0
+            self.screen_time = 0.0
+            self.verify_time = 0.0
+
+    def _candidate_crops(self, candidates, height, width):
+        """Padded, merged crops around candidate boxes"""
+        rects = []
+        for candidate in candidates:
+            x1, y1, x2, y2 = candidate["bbox"]
+            pad = int(max(x2 - x1, y2 - y1) * CANDIDATE_PADDING)
+            # Grow small candidates so the verifier sees enough context
+            cx, cy = (x1 + x2) // 2, (y1 + y2) // 2
+            half_w = max((x2 - x1) // 2 + pad, MIN_VERIFY_CROP // 2)
+            half_h = max((y2 - y1) // 2 + pad, MIN_VERIFY_CROP // 2)
+            rects.append((max(0, cx - half_w), max(0, cy - half_h),
+                          min(width, cx + half_w), min(height, cy + half_h)))
+        return [r for r in merge_rects(rects) if r[2] > r[0] and r[3] > r[1]]
+
+    def detect_batch(self, images, confidence_threshold=CONFIDENCE_THRESHOLD, **kwargs):
+        """Cascade over several images, verifying all their candidates in one batch"""
+        start = time.perf_counter()
+        # Ultralytics drops boxes under its own conf (0.25 by default) inside NMS,
+        # so the threshold has to reach the model as well as the filter
+        screened = self.screen_detector.detect_batch(
+            images, confidence_threshold=self.screen_threshold,
+            imgsz=self.screen_size, conf=self.screen_threshold)
+        screen_time = time.perf_counter() - start
+
+        crops = []
+        owners = []
+        for index, (image, candidates) in enumerate(zip(images, screened)):
+            if candidates:
+                height, width = image.shape[:2]
+                for rect in self._candidate_crops(candidates, height, width):
+                    crops.append(rect)
+                    owners.append(index)
+
+        start = time.perf_counter()
+        crop_images = [images[i][y1:y2, x1:x2] for i, (x1, y1, x2, y2) in zip(owners, crops)]
+        verify_kwargs = {"imgsz": self.verify_size, "conf": confidence_threshold, **kwargs}
+        verified = self.detector.detect_batch(
+            crop_images, confidence_threshold=confidence_threshold, **verify_kwargs)
+        verify_time = time.perf_counter() - start
+
+        detections = [[] for _ in images]
+        for owner, (x1, y1, _, _), crop_detections in zip(owners, crops, verified):
+            for detection in crop_detections:
+                bx1, by1, bx2, by2 = detection["bbox"]
+                detection["bbox"] = [bx1 + x1, by1 + y1, bx2 + x1, by2 + y1]
+                detections[owner].append(detection)
+
+        with self._lock:
+            self.frames += len(images)
+            self.frames_screened_out += sum(1 for candidates in screened if not candidates)
+            self.candidates += sum(len(candidates) for candidates in screened)
+            self.verified_crops += len(crops)
+            self.confirmed += sum(len(d) for d in detections)
+            self.screen_time += screen_time
+            self.verify_time += verify_time
+        return detections
+
+    def detect(self, image, annotate=True, confidence_threshold=CONFIDENCE_THRESHOLD, in_place=False, **kwargs):
+        """Cascade over a single image, returning (annotated_image, detections)"""
+        detections = self.detect_batch([image], confidence_threshold, **kwargs)[0]
+        annotated = None
+        if annotate:
+            # Drawing in place avoids a full-frame copy when the raw image is not needed again
+            annotated = draw_detections(image if in_place else image.copy(), detections)
+        return annotated, detections
+
+    def stats(self):
+        with self._lock:
+            frames = max(self.frames, 1)
+            return {
+                "frames": self.frames,
+                "frames_screened_out": self.frames_screened_out,
+                "candidates": self.candidates,
+                "verified_crops": self.verified_crops,
+                "confirmed_detections": self.confirmed,
+                "screen_size": self.screen_size,
+                "screen_threshold": self.screen_threshold,
+                "screen_ms_per_frame": round(1000 * self.screen_time / frames, 2),
+                "verify_ms_per_frame": round(1000 * self.verify_time / frames, 2)
+            }
+
+
+def create_cascade(detector):
+    """Cascade around detector, screening with the smaller exported model if configured"""
+    screen_detector = Detector(CASCADE_SCREEN_MODEL_PATH) if CASCADE_SCREEN_MODEL_PATH else None
+    return CascadeDetector(detector, screen_detector)
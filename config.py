@@ -11,6 +11,31 @@ CONFIDENCE_THRESHOLD = 0.3
 HIGH_CONFIDENCE_THRESHOLD = 0.7
 NMS_THRESHOLD = 0.7
 INPUT_SIZE = 640
+RESULTS_CSV = "results.csv"
+ROI_CONFIG_PATH = "roi_config.json"
+
+# Cascade Configuration
+CASCADE_SCREEN_SIZE = 320
+CASCADE_SCREEN_THRESHOLD = 0.1
+CASCADE_SCREEN_MODEL_PATH = os.getenv("CASCADE_SCREEN_MODEL_PATH")  # e.g. a smaller exported variant
+DETECTION_MODES = ("standard", "cascade")
+
+# Scheduling Configuration
+LIVE_FRAME_DEADLINE_MS = 100  # live frames not inferred within this of capture are dropped
+
+# Adaptive Sampling Configuration
+VIDEO_TARGET_FPS = 2  # frames inferred per second of uploaded video
+VIDEO_PROCESSING_SPEED = 1.0  # keep video analysis at least this fast relative to real time; None for no cap
+LIVE_TARGET_FPS = 30
+TARGET_LATENCY_MS = None  # set to shrink the inference image size until latency fits
+ADAPTIVE_IMAGE_SIZES = (640, 480, 320)
+SAMPLING_STRATEGIES = ("interval", "scene")
+SCENE_CHANGE_CELLS = 2  # signature cells that must change to infer a frame; a cell is ~10 px at 640 wide
+SCENE_MAX_GAP_SECONDS = 2.0  # infer at least this often even when nothing changes
+
+# Virtual Camera Configuration
+VIRTUAL_CAMERA_FPS = 30  # replay rate for image folders and videos without a frame rate
+VIRTUAL_CAMERA_MAX_FEEDS = 64
 
 # Server Configuration
 HOST = "0.0.0.0"
@@ -41,7 +66,10 @@ LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
 STATIC_DIR = Path("static")
 TEMPLATES_DIR = Path("templates")
 LOGS_DIR = Path("logs")
+EXPORTS_DIR = Path("exports")
+EXPORT_RETENTION_HOURS = 24  # annotated exports older than this are deleted
+EXPORT_MAX_FILES = 20  # and only this many of the newest are kept
 
 # Create directories if they don't exist
-for directory in [STATIC_DIR, TEMPLATES_DIR, LOGS_DIR]:
+for directory in [STATIC_DIR, TEMPLATES_DIR, LOGS_DIR, EXPORTS_DIR]:
     directory.mkdir(exist_ok=True)
\ No newline at end of file
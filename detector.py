@@ -0,0 +1,93 @@
+"""
+Shared YOLO inference path for the AI Sniper Detection System
+"""
+
+import threading
+
+import cv2
+import numpy as np
+
+from config import MODEL_PATH, CONFIDENCE_THRESHOLD, HIGH_CONFIDENCE_THRESHOLD
+
+
+def extract_detections(results, confidence_threshold=CONFIDENCE_THRESHOLD):
+    """Convert YOLO results into the detection dicts used by the API"""
+    detections = []
+    for result in results:
+        boxes = result.boxes
+        if boxes is None or len(boxes) == 0:
+            continue
+        # Move the whole result to numpy once instead of once per box
+        xyxy = boxes.xyxy.cpu().numpy()
+        confidences = boxes.conf.cpu().numpy()
+        for (x1, y1, x2, y2), confidence in zip(xyxy, confidences):
+            if confidence > confidence_threshold:
+                detections.append({
+                    "bbox": [int(x1), int(y1), int(x2), int(y2)],
+                    "confidence": float(confidence),
+                    "class": "sniper"
+                })
+    return detections
+
+
+def draw_detections(image, detections):
+    """Draw detection boxes onto image in place"""
+    for detection in detections:
+        x1, y1, x2, y2 = detection["bbox"]
+        confidence = detection["confidence"]
+        color = (0, 0, 255) if confidence > HIGH_CONFIDENCE_THRESHOLD else (0, 255, 255)
+        cv2.rectangle(image, (x1, y1), (x2, y2), color, 2)
+        cv2.putText(image, f'Sniper: {confidence:.2f}',
+                    (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
+    return image
+
+
+def decode_image(data):
+    """Decode an encoded image buffer into a BGR array"""
+    image = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        raise ValueError("Could not decode image")
+    return image
+
+
+class Detector:
+    """Thread-safe wrapper around the trained YOLO model"""
+
+    def __init__(self, model_path=MODEL_PATH):
+        self.model_path = model_path
+        self.model = None
+        self._load_lock = threading.Lock()
+        # Ultralytics predictors keep per-call state, so inference is serialized
+        self._infer_lock = threading.Lock()
+
+    def load(self):
+        """Load the model if it has not been loaded yet"""
+        if self.model is None:
+            with self._load_lock:
+                if self.model is None:
+                    from ultralytics import YOLO
+                    self.model = YOLO(self.model_path)
+        return self.model
+
+    def predict(self, image, **kwargs):
+        """Run the raw model on an image and return YOLO results"""
+        model = self.load()
+        with self._infer_lock:
+            return model(image, **kwargs)
+
+    def detect(self, image, annotate=True, confidence_threshold=CONFIDENCE_THRESHOLD, in_place=False, **kwargs):
+        """Detect snipers in a BGR image, returning (annotated_image, detections)"""
+        results = self.predict(image, **kwargs)
+        detections = extract_detections(results, confidence_threshold)
+        annotated = None
+        if annotate:
+            # Drawing in place avoids a full-frame copy when the raw image is not needed again
+            annotated = draw_detections(image if in_place else image.copy(), detections)
+        return annotated, detections
+
+    def detect_batch(self, images, confidence_threshold=CONFIDENCE_THRESHOLD, **kwargs):
+        """Run one batched inference over several images, returning detections per image"""
+        if not images:
+            return []
+        results = self.predict(list(images), **kwargs)
+        return [extract_detections([result], confidence_threshold) for result in results]
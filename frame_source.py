@@ -0,0 +1,313 @@
+"""
+Background frame decoding for video and camera ingestion
+"""
+
+import queue
+import threading
+import time
+
+import cv2
+import numpy as np
+
+# Marks the end of the stream in the frame queue
+_END = object()
+
+
+class FramePool:
+    """Reusable preallocated frame buffers, keyed by shape"""
+
+    def __init__(self, capacity=4):
+        self.capacity = capacity
+        self._free = {}
+        self._lock = threading.Lock()
+        self.reuses = 0
+        self.allocations = 0
+        self.bytes_allocated = 0
+
+    def acquire(self, shape):
+        """A free buffer of shape, allocating one only if none is available"""
+        with self._lock:
+            free = self._free.get(shape)
+            if free:
+                self.reuses += 1
+                return free.pop()
+        array = np.empty(shape, np.uint8)
+        self.record_allocation(array)
+        return array
+
+    def release(self, array):
+        """Return a buffer to the pool once nothing references its contents"""
+        with self._lock:
+            free = self._free.setdefault(array.shape, [])
+            if len(free) < self.capacity:
+                free.append(array)
+
+    def record_allocation(self, array):
+        """Count a frame buffer allocated outside the pool"""
+        with self._lock:
+            self.allocations += 1
+            self.bytes_allocated += array.nbytes
+
+    def stats(self):
+        with self._lock:
+            return {
+                "reuses": self.reuses,
+                "allocations": self.allocations,
+                "bytes_allocated": self.bytes_allocated,
+                "free_buffers": sum(len(free) for free in self._free.values())
+            }
+
+
+class DecodedFrame:
+    """A decoded frame and the scale applied to it relative to the source"""
+
+    def __init__(self, index, image, scale=1.0, pool=None, signature=None):
+        self.index = index
+        self.image = image
+        self.scale = scale
+        self.pool = pool
+        # Cheap content fingerprint for scene-change sampling, if the source computes one
+        self.signature = signature
+        # time.perf_counter() when decoding finished, for deadline scheduling
+        self.decoded_at = time.perf_counter()
+
+    def release(self):
+        """Hand the image buffer back to the decoder; the image must not be used afterwards"""
+        if self.pool is not None and self.image is not None:
+            self.pool.release(self.image)
+        self.image = None
+
+
+def scale_detections(detections, scale):
+    """Map detection boxes from a resized frame back to source coordinates"""
+    if scale != 1.0:
+        for detection in detections:
+            detection["bbox"] = [int(round(v / scale)) for v in detection["bbox"]]
+    return detections
+
+
+class FrameSource:
+    """Decode frames on a background thread into a bounded queue
+
+    File sources block the decoder when the queue is full so no frame is lost.
+    Live sources drop the oldest queued frame instead, so consumers always get
+    the freshest image. Frames not selected by sample_rate are only grabbed,
+    never retrieved, which skips the colour conversion and copy. sample_rate
+    may be changed while decoding; it sets the gap after the next sampled frame.
+
+    Frames are decoded into buffers from a FramePool; consumers call
+    DecodedFrame.release() when done so the buffer is reused for a later frame.
+    When signature is given, it is called on each decoded frame on the decoder
+    thread and the result attached as DecodedFrame.signature.
+    """
+
+    def __init__(self, capture, queue_size=8, resize_to=None, live=False, sample_rate=1, pool_size=None,
+                 signature=None):
+        self.capture = capture
+        self.queue = queue.Queue(maxsize=queue_size)
+        # By default: queued frames plus one being decoded and one held by the consumer
+        self.pool = FramePool(capacity=pool_size or queue_size + 2)
+        self._frame_shape = None
+        self.resize_to = resize_to
+        self.live = live
+        self.sample_rate = max(1, int(sample_rate))
+        self.signature = signature
+        self.finished = False
+        self._stop = threading.Event()
+        self._thread = None
+
+        # Utilization counters
+        self.frames_decoded = 0
+        self.frames_skipped = 0
+        self.frames_dropped = 0
+        self.read_errors = 0
+        self.peak_queue = 0
+        self.decode_time = 0.0
+        self.decoder_blocked_time = 0.0
+        self.consumer_wait_time = 0.0
+        self.consumer_busy_time = 0.0
+        self._last_return = None
+        self._last_read = None
+        self._started = None
+        self._ended = None
+
+    def start(self):
+        """Start the decoder thread"""
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="frame-decoder", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop decoding and wait for the decoder thread to exit"""
+        self._stop.set()
+        # Unblock a decoder waiting on a full queue
+        while True:
+            try:
+                item = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _END:
+                item.release()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=2.0)
+        if self._ended is None:
+            self._ended = time.perf_counter()
+
+    def _prepare(self, image):
+        """Resize image so its longest side fits resize_to"""
+        if not self.resize_to:
+            return image, 1.0
+        height, width = image.shape[:2]
+        scale = self.resize_to / max(height, width)
+        if scale >= 1.0:
+            return image, 1.0
+        size = (int(round(width * scale)), int(round(height * scale)))
+        resized = cv2.resize(image, size, dst=self.pool.acquire((size[1], size[0]) + image.shape[2:]),
+                             interpolation=cv2.INTER_AREA)
+        # The full-size decode buffer is free again as soon as it has been resized
+        self.pool.release(image)
+        return resized, scale
+
+    def _decode(self, grabbed=False):
+        """Retrieve the next frame into a pooled buffer, grabbing it first unless already grabbed"""
+        buffer = self.pool.acquire(self._frame_shape) if self._frame_shape else None
+        fetch = self.capture.retrieve if grabbed else self.capture.read
+        ok, image = fetch(buffer) if buffer is not None else fetch()
+        if not ok:
+            if buffer is not None:
+                self.pool.release(buffer)
+            return False, None
+        if image is not buffer:
+            # The capture changed size or ignored the buffer and allocated its own
+            self.pool.record_allocation(image)
+            if buffer is not None:
+                self.pool.release(buffer)
+            self._frame_shape = image.shape
+        return True, image
+
+    def _run(self):
+        index = 0
+        next_sample = 0
+        try:
+            while not self._stop.is_set():
+                start = time.perf_counter()
+                wanted = index >= next_sample
+                if self.live:
+                    # A live capture blocks in grab() until the next frame is due;
+                    # that wait is idle time, not decode work
+                    ok, image = self.capture.grab(), None
+                    start = time.perf_counter()
+                    if ok and wanted:
+                        ok, image = self._decode(grabbed=True)
+                elif wanted:
+                    ok, image = self._decode()
+                else:
+                    ok, image = self.capture.grab(), None
+                if not ok:
+                    if not self.live:
+                        break
+                    # Cameras occasionally miss a frame; keep polling
+                    self.read_errors += 1
+                    time.sleep(0.01)
+                    continue
+                if wanted:
+                    next_sample = index + max(1, int(self.sample_rate))
+                    image, scale = self._prepare(image)
+                    signature = self.signature(image) if self.signature else None
+                    self.decode_time += time.perf_counter() - start
+                    self.frames_decoded += 1
+                    self._put(DecodedFrame(index, image, scale, self.pool, signature))
+                else:
+                    self.decode_time += time.perf_counter() - start
+                    self.frames_skipped += 1
+                index += 1
+        except Exception as e:
+            print(f"Frame decoder error: {e}")
+        finally:
+            self._ended = time.perf_counter()
+            self._put(_END)
+
+    def _put(self, item):
+        """Queue an item, dropping or blocking according to the source type"""
+        if self.live:
+            while True:
+                try:
+                    self.queue.put_nowait(item)
+                    break
+                except queue.Full:
+                    try:
+                        dropped = self.queue.get_nowait()
+                    except queue.Empty:
+                        continue
+                    if dropped is not _END:
+                        dropped.release()
+                    self.frames_dropped += 1
+        else:
+            blocked = time.perf_counter()
+            while not self._stop.is_set():
+                try:
+                    self.queue.put(item, timeout=0.1)
+                    break
+                except queue.Full:
+                    continue
+            else:
+                if item is not _END:
+                    item.release()
+            self.decoder_blocked_time += time.perf_counter() - blocked
+        self.peak_queue = max(self.peak_queue, self.queue.qsize())
+
+    def read(self, timeout=None):
+        """Return the next DecodedFrame, or None at the end of the stream or on timeout"""
+        if self.finished:
+            return None
+        now = time.perf_counter()
+        if self._last_return is not None:
+            # Time since the previous frame was handed out is spent in inference
+            self.consumer_busy_time += now - self._last_return
+        try:
+            item = self.queue.get(timeout=timeout)
+        except queue.Empty:
+            item = None
+        returned = self._last_read = time.perf_counter()
+        self.consumer_wait_time += returned - now
+        # A poll that timed out handed nothing out, so the time until the next read is not busy
+        self._last_return = returned if item is not None and item is not _END else None
+        if item is _END:
+            self.finished = True
+            return None
+        return item
+
+    def __iter__(self):
+        while True:
+            frame = self.read()
+            if frame is None:
+                return
+            yield frame
+
+    def stats(self):
+        """Decode vs inference utilization, for sizing the queue"""
+        if self._started is None:
+            return {}
+        if self.finished or self._stop.is_set():
+            end = max(self._ended or 0.0, self._last_read or 0.0)
+        else:
+            end = time.perf_counter()
+        elapsed = max(end - self._started, 1e-9)
+        return {
+            "frames_decoded": self.frames_decoded,
+            "frames_skipped": self.frames_skipped,
+            "frames_dropped": self.frames_dropped,
+            "read_errors": self.read_errors,
+            "queue_capacity": self.queue.maxsize,
+            "queue_depth": self.queue.qsize(),
+            "peak_queue_depth": self.peak_queue,
+            "decode_ms_per_frame": round(1000 * self.decode_time / max(self.frames_decoded, 1), 2),
+            # High decode utilization with a starved consumer means decode is the bottleneck
+            "decode_utilization": round(self.decode_time / elapsed, 3),
+            "inference_utilization": round(self.consumer_busy_time / elapsed, 3),
+            # A decoder often blocked on a full queue means inference is the bottleneck
+            "decoder_blocked_ratio": round(self.decoder_blocked_time / elapsed, 3),
+            "consumer_starved_ratio": round(self.consumer_wait_time / elapsed, 3),
+            "buffers": self.pool.stats()
+        }
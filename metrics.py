@@ -0,0 +1,126 @@
+"""
+Cached training metrics service backed by the YOLO results.csv
+"""
+
+import csv
+import os
+import threading
+
+from config import RESULTS_CSV
+
+# API name -> results.csv header
+METRIC_COLUMNS = {
+    'epoch': 'epoch',
+    'time': 'time',
+    'precision': 'metrics/precision(B)',
+    'recall': 'metrics/recall(B)',
+    'mAP50': 'metrics/mAP50(B)',
+    'mAP50_95': 'metrics/mAP50-95(B)',
+    'train_box_loss': 'train/box_loss',
+    'train_cls_loss': 'train/cls_loss',
+    'train_dfl_loss': 'train/dfl_loss',
+    'val_box_loss': 'val/box_loss',
+    'val_cls_loss': 'val/cls_loss',
+    'val_dfl_loss': 'val/dfl_loss',
+    'lr': 'lr/pg0'
+}
+
+# Columns that describe the run rather than model quality, so cannot rank epochs
+UNRANKED_METRICS = {'epoch', 'time', 'lr'}
+
+
+def downsample_indices(count, max_points):
+    """Pick up to max_points evenly spaced indices, always keeping the first and last"""
+    if not max_points or count <= max_points:
+        return list(range(count))
+    if max_points == 1:
+        return [count - 1]
+    step = (count - 1) / (max_points - 1)
+    return sorted({round(i * step) for i in range(max_points)})
+
+
+class TrainingMetrics:
+    """Parse results.csv once and re-read it only when its mtime changes"""
+
+    def __init__(self, path=RESULTS_CSV):
+        self.path = path
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._columns = {}
+
+    def _load(self):
+        """Return the cached columns, reparsing the CSV if it changed on disk"""
+        mtime = os.stat(self.path).st_mtime_ns
+        with self._lock:
+            if mtime != self._mtime:
+                with open(self.path, newline='') as f:
+                    reader = csv.reader(f)
+                    # Ultralytics pads headers with spaces in some versions
+                    header = [name.strip() for name in next(reader, [])]
+                    fields = [(name, header.index(column)) for name, column in METRIC_COLUMNS.items()
+                              if column in header]
+                    columns = {name: [] for name, _ in fields}
+                    for row in reader:
+                        try:
+                            values = [float(row[index]) for _, index in fields]
+                        except (IndexError, ValueError):
+                            # Training appends rows as it runs; skip a half-written or malformed one
+                            continue
+                        for (name, _), value in zip(fields, values):
+                            columns[name].append(int(value) if name == 'epoch' else value)
+                self._columns = columns
+                self._mtime = mtime
+            return self._columns
+
+    def latest(self):
+        """Metrics for the most recent epoch"""
+        columns = self._load()
+        if not columns.get('epoch'):
+            raise LookupError("No metrics found")
+        return {name: values[-1] for name, values in columns.items()}
+
+    def curves(self, names=None, max_points=None):
+        """Per-epoch curves, optionally restricted to names and downsampled to max_points"""
+        if max_points is not None and max_points < 1:
+            raise ValueError("points must be at least 1")
+        columns = self._load()
+        if names:
+            unknown = [name for name in names if name not in METRIC_COLUMNS]
+            if unknown:
+                raise KeyError(f"Unknown metrics: {', '.join(unknown)}")
+            names = ['epoch'] + [name for name in names if name != 'epoch']
+        else:
+            names = list(columns)
+        count = len(columns.get('epoch', []))
+        indices = downsample_indices(count, max_points)
+        return {
+            'total_epochs': count,
+            'points': len(indices),
+            'curves': {
+                name: [columns[name][i] for i in indices]
+                for name in names if name in columns
+            }
+        }
+
+    def best(self, metric='mAP50_95'):
+        """Summary of the best epoch by metric: lowest for losses, highest otherwise"""
+        if metric in UNRANKED_METRICS:
+            raise ValueError(f"Cannot rank epochs by {metric}")
+        columns = self._load()
+        if metric not in columns:
+            raise KeyError(f"Unknown metric: {metric}")
+        values = columns[metric]
+        if not values:
+            raise LookupError("No metrics found")
+        pick = min if metric.endswith('_loss') else max
+        index = pick(range(len(values)), key=values.__getitem__)
+        summary = {name: column[index] for name, column in columns.items()}
+        return {
+            'metric': metric,
+            'best_epoch': columns['epoch'][index],
+            'total_epochs': len(values),
+            'metrics': summary
+        }
+
+
+training_metrics = TrainingMetrics()
@@ -0,0 +1,211 @@
+"""
+Per-camera regions of interest and exclusion zones
+"""
+
+import json
+import os
+import threading
+
+import cv2
+import numpy as np
+
+from config import ROI_CONFIG_PATH
+from detector import draw_detections
+
+# Extra context kept around each region crop, in pixels
+CROP_PADDING = 16
+
+
+def _clean_polygons(polygons, field):
+    """Validate a list of polygons from the API or the config file"""
+    if not isinstance(polygons, list):
+        raise ValueError(f"'{field}' must be a list of polygons")
+    cleaned = []
+    for i, polygon in enumerate(polygons):
+        if not isinstance(polygon, dict):
+            polygon = {"points": polygon}
+        points = polygon.get("points")
+        if not isinstance(points, list) or len(points) < 3:
+            raise ValueError(f"{field}[{i}] needs at least 3 points")
+        try:
+            points = [[int(x), int(y)] for x, y in points]
+        except (TypeError, ValueError):
+            raise ValueError(f"{field}[{i}] points must be [x, y] pairs")
+        cleaned.append({
+            "name": str(polygon.get("name", f"{field}_{i}")),
+            "points": points,
+            "enabled": bool(polygon.get("enabled", True))
+        })
+    return cleaned
+
+
+def merge_rects(rects):
+    """Union overlapping (x1, y1, x2, y2) rectangles so no pixel is inferred twice"""
+    rects = list(rects)
+    merged = True
+    while merged:
+        merged = False
+        for i in range(len(rects)):
+            for j in range(i + 1, len(rects)):
+                a, b = rects[i], rects[j]
+                if a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]:
+                    rects[i] = (min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3]))
+                    del rects[j]
+                    merged = True
+                    break
+            if merged:
+                break
+    return rects
+
+
+class CameraROI:
+    """Regions to infer and zones to ignore for one camera"""
+
+    def __init__(self, regions=None, exclusions=None):
+        self.regions = _clean_polygons(regions or [], "regions")
+        self.exclusions = _clean_polygons(exclusions or [], "exclusions")
+        self._layouts = {}
+        self.frames = 0
+        self.last_crops = 0
+        self.pixels_total = 0
+        self.pixels_inferred = 0
+
+    def to_dict(self):
+        return {"regions": self.regions, "exclusions": self.exclusions}
+
+    def _layout(self, height, width):
+        """Crops and masks for a frame size, computed once per size"""
+        key = (height, width)
+        if key not in self._layouts:
+            active = [np.array(r["points"], np.int32) for r in self.regions if r["enabled"]]
+            excluded = [np.array(e["points"], np.int32) for e in self.exclusions if e["enabled"]]
+
+            region_mask = None
+            crops = [(0, 0, width, height)]
+            if active:
+                region_mask = np.zeros((height, width), np.uint8)
+                cv2.fillPoly(region_mask, active, 1)
+                rects = []
+                for polygon in active:
+                    x, y, w, h = cv2.boundingRect(polygon)
+                    rects.append((max(0, x - CROP_PADDING), max(0, y - CROP_PADDING),
+                                  min(width, x + w + CROP_PADDING), min(height, y + h + CROP_PADDING)))
+                crops = [r for r in merge_rects(rects) if r[2] > r[0] and r[3] > r[1]]
+
+            exclusion_mask = None
+            if excluded:
+                exclusion_mask = np.zeros((height, width), np.uint8)
+                cv2.fillPoly(exclusion_mask, excluded, 1)
+
+            self._layouts[key] = (crops, region_mask, exclusion_mask)
+        return self._layouts[key]
+
+    def _keep(self, detection, region_mask, exclusion_mask):
+        """Keep boxes centred inside an active region and outside every exclusion"""
+        if region_mask is None and exclusion_mask is None:
+            return True
+        x1, y1, x2, y2 = detection["bbox"]
+        height, width = (region_mask if region_mask is not None else exclusion_mask).shape
+        cx = min(max((x1 + x2) // 2, 0), width - 1)
+        cy = min(max((y1 + y2) // 2, 0), height - 1)
+        if region_mask is not None and not region_mask[cy, cx]:
+            return False
+        if exclusion_mask is not None and exclusion_mask[cy, cx]:
+            return False
+        return True
+
+    def detect(self, detector, frame, annotate=True, in_place=False, **kwargs):
+        """Infer only the region crops of frame, returning (annotated_frame, detections)"""
+        height, width = frame.shape[:2]
+        crops, region_mask, exclusion_mask = self._layout(height, width)
+
+        # Slices are views into the frame, so cropping copies nothing
+        images = [frame[y1:y2, x1:x2] for x1, y1, x2, y2 in crops]
+        per_crop = detector.detect_batch(images, **kwargs)
+
+        detections = []
+        for (x1, y1, _, _), crop_detections in zip(crops, per_crop):
+            for detection in crop_detections:
+                bx1, by1, bx2, by2 = detection["bbox"]
+                detection["bbox"] = [bx1 + x1, by1 + y1, bx2 + x1, by2 + y1]
+                if self._keep(detection, region_mask, exclusion_mask):
+                    detections.append(detection)
+
+        self.frames += 1
+        self.last_crops = len(crops)
+        self.pixels_total += height * width
+        self.pixels_inferred += sum((x2 - x1) * (y2 - y1) for x1, y1, x2, y2 in crops)
+
+        annotated = None
+        if annotate:
+            annotated = frame if in_place else frame.copy()
+            for zone, color in ((self.regions, (0, 200, 0)), (self.exclusions, (128, 128, 128))):
+                polygons = [np.array(z["points"], np.int32) for z in zone if z["enabled"]]
+                if polygons:
+                    cv2.polylines(annotated, polygons, True, color, 1)
+            draw_detections(annotated, detections)
+        return annotated, detections
+
+    def stats(self):
+        return {
+            "frames": self.frames,
+            "crops": self.last_crops,
+            "inferred_pixel_ratio": round(self.pixels_inferred / self.pixels_total, 3)
+            if self.pixels_total else None
+        }
+
+
+class ROIManager:
+    """Per-camera ROI configuration persisted as JSON"""
+
+    def __init__(self, path=ROI_CONFIG_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self.cameras = {}
+        self.load()
+
+    def load(self):
+        """Load the saved configuration, ignoring a missing file"""
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path) as f:
+                saved = json.load(f)
+            self.cameras = {str(camera_id): CameraROI(**config) for camera_id, config in saved.items()}
+        except (OSError, ValueError, TypeError) as e:
+            print(f"Error loading ROI config: {e}")
+
+    def save(self):
+        """Write the configuration atomically"""
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+        os.replace(temp_path, self.path)
+
+    def to_dict(self):
+        return {camera_id: roi.to_dict() for camera_id, roi in self.cameras.items()}
+
+    def get(self, camera_id):
+        """CameraROI for camera_id, or None if the camera infers full frames"""
+        return self.cameras.get(str(camera_id))
+
+    def set(self, camera_id, config):
+        """Replace the ROI configuration of a camera; raises ValueError if invalid"""
+        if not isinstance(config, dict):
+            raise ValueError("ROI config must be an object")
+        roi = CameraROI(config.get("regions"), config.get("exclusions"))
+        with self._lock:
+            self.cameras[str(camera_id)] = roi
+            self.save()
+        return roi
+
+    def remove(self, camera_id):
+        """Drop the ROI configuration of a camera, returning whether it existed"""
+        with self._lock:
+            removed = self.cameras.pop(str(camera_id), None) is not None
+            if removed:
+                self.save()
+        return removed
+
+
+roi_manager = ROIManager()
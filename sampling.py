@@ -0,0 +1,277 @@
+"""
+Adaptive and scene-change frame sampling for video and camera inference
+"""
+
+import threading
+from collections import deque
+
+import cv2
+import numpy as np
+
+from config import (TARGET_LATENCY_MS, ADAPTIVE_IMAGE_SIZES,
+                    SCENE_CHANGE_CELLS, SCENE_MAX_GAP_SECONDS)
+
+# Fraction of the wall-clock budget inference may use, leaving room for decode and encode
+HEADROOM = 0.8
+# Sampling rate multiplier while detections are being seen
+ACTIVE_BOOST = 2.0
+# Sampling rate divisor once IDLE_AFTER consecutive samples found nothing
+IDLE_BACKOFF = 2.0
+IDLE_AFTER = 10
+# Recent samples the rolling averages are taken over
+SAMPLING_WINDOW = 20
+# Rate changes kept for stats
+HISTORY_SIZE = 20
+# Side of the greyscale thumbnail used as a frame signature; at 640 px wide a cell is 10 px
+SIGNATURE_SIZE = 64
+# Thumbnail cells must change by more than this many grey levels to count
+SIGNATURE_PIXEL_DELTA = 10
+
+
+def _mean(values):
+    return sum(values) / len(values) if values else None
+
+
+def frame_signature(image):
+    """Tiny greyscale thumbnail of a BGR frame, cheap enough to compute for every frame"""
+    # Shrinking first means the colour conversion touches only the thumbnail
+    thumbnail = cv2.resize(image, (SIGNATURE_SIZE, SIGNATURE_SIZE), interpolation=cv2.INTER_AREA)
+    return cv2.cvtColor(thumbnail, cv2.COLOR_BGR2GRAY)
+
+
+def signature_distance(a, b):
+    """Number of thumbnail cells that changed between two signatures
+
+    Counting changed cells rather than averaging the difference keeps a small
+    target entering the frame from being diluted by an unchanged background.
+    """
+    return int(np.count_nonzero(cv2.absdiff(a, b) > SIGNATURE_PIXEL_DELTA))
+
+
+class AdaptiveSampler:
+    """Choose how often to infer a source from its measured inference latency
+
+    The base rate is target_fps sampled frames per source second, boosted while
+    detections are active and backed off once a run of samples finds nothing.
+    When speed is set, the rate is also capped so inference keeps up with the
+    source played at speed times real time; the measured latency includes time
+    queued in the scheduler, so the cap tightens when other work competes. With
+    a target latency, the inference image size steps down through image_sizes
+    while latency is over target and back up once there is room.
+    """
+
+    strategy = "interval"
+
+    def __init__(self, source_fps, target_fps, speed=1.0, target_latency_ms=TARGET_LATENCY_MS,
+                 image_sizes=ADAPTIVE_IMAGE_SIZES, max_interval=None, window=SAMPLING_WINDOW):
+        self.source_fps = source_fps if source_fps > 0 else 30
+        self.target_fps = min(target_fps, self.source_fps)
+        self.speed = speed
+        self.target_latency = target_latency_ms / 1000 if target_latency_ms else None
+        self.image_sizes = sorted(image_sizes, reverse=True)
+        # Never sample less often than once every two seconds of source
+        self.max_interval = max_interval or max(1, int(self.source_fps * 2))
+        self.window = window
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=window)
+        self._queue_depths = deque(maxlen=window)
+        self._size_index = 0
+        self._size_cooldown = 0
+        self.idle_samples = 0
+        self.samples = 0
+        self.dropped = 0
+        self.adjustments = 0
+        self.reason = "target"
+        self.interval = self._interval_for(self.target_fps)
+        self.history = deque(maxlen=HISTORY_SIZE)
+        self._last_selected = None
+
+    @property
+    def rate(self):
+        """Sampled frames per source second at the current interval"""
+        return self.source_fps / self.interval
+
+    @property
+    def imgsz(self):
+        return self.image_sizes[self._size_index] if self.image_sizes else None
+
+    def inference_kwargs(self):
+        """Extra detect() arguments, only overriding the image size when it adapts"""
+        if self.target_latency and len(self.image_sizes) > 1:
+            return {"imgsz": self.imgsz}
+        return {}
+
+    @property
+    def decode_interval(self):
+        """Sample rate for the decoder, so unselected frames are never decoded"""
+        return self.interval
+
+    def select(self, frame):
+        """Strategy name if frame should be inferred, else None"""
+        if self._last_selected is not None and frame.index < self._last_selected + self.interval:
+            return None
+        self._last_selected = frame.index
+        return self.strategy
+
+    def delay(self, elapsed):
+        """Seconds a live loop should wait after an iteration that took elapsed seconds"""
+        return max(0.0, 1.0 / self.rate - elapsed)
+
+    def _interval_for(self, rate):
+        interval = round(self.source_fps / rate) if rate > 0 else self.max_interval
+        return min(max(1, interval), self.max_interval)
+
+    def record(self, latency, detections=0, queue_depth=0):
+        """Feed one inference's wall time, detection count and scheduler queue depth"""
+        with self._lock:
+            self.samples += 1
+            self._latencies.append(latency)
+            self._queue_depths.append(queue_depth)
+            self.idle_samples = 0 if detections else self.idle_samples + 1
+            self._adapt_size()
+            self._adapt_rate()
+
+    def record_drop(self, queue_depth=0):
+        """Feed a sample that was dropped before inference could start, e.g. past its deadline
+
+        A drop says nothing about latency or detections, only that work is
+        backing up, so it counts as a backlog sample with the dropped frame
+        itself queued behind queue_depth.
+        """
+        with self._lock:
+            self.dropped += 1
+            self._queue_depths.append(queue_depth + 1)
+            self._adapt_rate()
+
+    def _adapt_size(self):
+        if not self.target_latency or len(self.image_sizes) < 2:
+            return
+        if self._size_cooldown:
+            self._size_cooldown -= 1
+            return
+        latency = _mean(self._latencies)
+        index = self._size_index
+        if latency > self.target_latency * 1.1 and index < len(self.image_sizes) - 1:
+            index += 1
+        elif latency < self.target_latency * 0.6 and index > 0:
+            index -= 1
+        if index != self._size_index:
+            self._size_index = index
+            # Latencies at the old size no longer apply; wait for fresh ones before moving again
+            self._latencies.clear()
+            self._size_cooldown = self.window // 2
+            self._log("latency")
+
+    def _adapt_rate(self):
+        if self.idle_samples == 0:
+            wanted, reason = self.target_fps * ACTIVE_BOOST, "active"
+        elif self.idle_samples >= IDLE_AFTER:
+            wanted, reason = self.target_fps / IDLE_BACKOFF, "idle"
+        else:
+            wanted, reason = self.target_fps, "target"
+
+        latency = _mean(self._latencies)
+        if self.speed and latency:
+            capacity = HEADROOM / (latency * self.speed)
+            if capacity < wanted:
+                wanted, reason = capacity, "load"
+        backlog = _mean(self._queue_depths)
+        if backlog and backlog > 1:
+            # Work is queueing ahead of this source; shed in proportion
+            wanted, reason = wanted / backlog, "backlog"
+
+        interval = self._interval_for(min(wanted, self.source_fps))
+        if interval != self.interval:
+            self.interval = interval
+            self.reason = reason
+            self._log(reason)
+
+    def _log(self, reason):
+        self.adjustments += 1
+        self.history.append({
+            "sample": self.samples,
+            "interval": self.interval,
+            "rate_fps": round(self.rate, 2),
+            "imgsz": self.imgsz,
+            "reason": reason
+        })
+
+    def stats(self):
+        with self._lock:
+            latency = _mean(self._latencies)
+            backlog = _mean(self._queue_depths)
+            return {
+                "strategy": self.strategy,
+                "source_fps": self.source_fps,
+                "target_fps": self.target_fps,
+                "interval": self.interval,
+                "rate_fps": round(self.rate, 2),
+                "imgsz": self.imgsz,
+                "reason": self.reason,
+                "latency_ms_avg": round(1000 * latency, 2) if latency is not None else None,
+                "queue_depth_avg": round(backlog, 2) if backlog is not None else None,
+                "active": self.idle_samples == 0 and self.samples > 0,
+                "samples": self.samples,
+                "dropped": self.dropped,
+                "adjustments": self.adjustments,
+                "history": list(self.history)
+            }
+
+
+class SceneChangeSampler:
+    """Infer only frames that differ from the last inferred one
+
+    Each frame's signature is compared with the signature of the last frame
+    that was inferred, so slow drift accumulates until it counts as a change.
+    A frame is inferred regardless once max_gap_seconds of source have passed
+    without one. Frames must carry a signature, see FrameSource(signature=...).
+    """
+
+    strategy = "scene"
+    # Every frame is decoded so its signature can be compared
+    decode_interval = 1
+
+    def __init__(self, source_fps, min_cells=SCENE_CHANGE_CELLS, max_gap_seconds=SCENE_MAX_GAP_SECONDS):
+        self.source_fps = source_fps if source_fps > 0 else 30
+        self.min_cells = min_cells
+        self.max_gap = max(1, int(round(max_gap_seconds * self.source_fps)))
+        self._signature = None
+        self._last_selected = None
+        self.frames = 0
+        self.reasons = {"first_frame": 0, "scene_change": 0, "max_gap": 0}
+        self.latency = 0.0
+
+    def select(self, frame):
+        """Reason the frame should be inferred, or None if it is unchanged"""
+        self.frames += 1
+        if self._signature is None:
+            reason = "first_frame"
+        elif signature_distance(frame.signature, self._signature) >= self.min_cells:
+            reason = "scene_change"
+        elif frame.index - self._last_selected >= self.max_gap:
+            reason = "max_gap"
+        else:
+            return None
+        self._signature = frame.signature
+        self._last_selected = frame.index
+        self.reasons[reason] += 1
+        return reason
+
+    def inference_kwargs(self):
+        return {}
+
+    def record(self, latency, detections=0, queue_depth=0):
+        self.latency += latency
+
+    def stats(self):
+        inferred = sum(self.reasons.values())
+        return {
+            "strategy": self.strategy,
+            "min_cells": self.min_cells,
+            "max_gap_frames": self.max_gap,
+            "frames": self.frames,
+            "inferred": inferred,
+            "inferred_ratio": round(inferred / self.frames, 3) if self.frames else None,
+            "reasons": dict(self.reasons),
+            "latency_ms_avg": round(1000 * self.latency / inferred, 2) if inferred else None
+        }
@@ -0,0 +1,180 @@
+"""
+Deadline-aware priority scheduling of model inference
+"""
+
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+# Priority classes, lowest value runs first
+LIVE = 0
+INTERACTIVE = 1
+BATCH = 2
+PRIORITY_NAMES = {LIVE: "live", INTERACTIVE: "interactive", BATCH: "batch"}
+
+# Recent samples kept per class for latency percentiles
+LATENCY_WINDOW = 500
+
+
+class DeadlineMissed(Exception):
+    """Work was shed because its deadline passed before inference could start"""
+
+
+def _percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class _ClassStats:
+    def __init__(self):
+        self.submitted = 0
+        self.completed = 0
+        self.shed = 0
+        self.failed = 0
+        self.queued = 0
+        self.waits = deque(maxlen=LATENCY_WINDOW)
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+
+    def summary(self):
+        waits = list(self.waits)
+        latencies = list(self.latencies)
+        return {
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "shed": self.shed,
+            "failed": self.failed,
+            "queued": self.queued,
+            "queue_wait_ms_avg": round(1000 * sum(waits) / len(waits), 2) if waits else None,
+            "latency_ms_avg": round(1000 * sum(latencies) / len(latencies), 2) if latencies else None,
+            "latency_ms_p95": round(1000 * _percentile(latencies, 0.95), 2) if latencies else None
+        }
+
+
+class _Job:
+    __slots__ = ("fn", "args", "kwargs", "deadline", "submitted_at", "future")
+
+    def __init__(self, fn, args, kwargs, deadline):
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.deadline = deadline
+        self.submitted_at = time.perf_counter()
+        self.future = Future()
+
+
+class InferenceScheduler:
+    """Single inference worker that always runs the most urgent queued job
+
+    Jobs are ordered by priority class, then by earliest deadline. A job whose
+    deadline (a time.perf_counter() value) has passed when it reaches the front
+    is shed with DeadlineMissed instead of running late. Batch work is submitted
+    one frame at a time, so live and interactive jobs overtake it at the next
+    frame boundary.
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._condition = threading.Condition()
+        self._counter = itertools.count()
+        self._thread = None
+        self._running = False
+        self._stats = {priority: _ClassStats() for priority in PRIORITY_NAMES}
+        self.preemptions = 0
+
+    def start(self):
+        """Start the worker thread if it is not running"""
+        with self._condition:
+            if self._running:
+                return self
+            self._running = True
+        self._thread = threading.Thread(target=self._worker, name="inference-scheduler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop the worker once the current job finishes; queued jobs are cancelled"""
+        with self._condition:
+            self._running = False
+            pending, self._heap = self._heap, []
+            self._condition.notify_all()
+        for _, _, _, job in pending:
+            job.future.cancel()
+
+    def submit(self, priority, fn, *args, deadline=None, **kwargs):
+        """Queue fn(*args, **kwargs) and return a Future for its result"""
+        if priority not in PRIORITY_NAMES:
+            raise ValueError(f"Unknown priority class: {priority}")
+        self.start()
+        job = _Job(fn, args, kwargs, deadline)
+        key = deadline if deadline is not None else float("inf")
+        with self._condition:
+            heapq.heappush(self._heap, (priority, key, next(self._counter), job))
+            stats = self._stats[priority]
+            stats.submitted += 1
+            stats.queued += 1
+            self._condition.notify()
+        return job.future
+
+    def run(self, priority, fn, *args, deadline=None, **kwargs):
+        """Run fn through the scheduler and wait for its result"""
+        return self.submit(priority, fn, *args, deadline=deadline, **kwargs).result()
+
+    async def run_async(self, priority, fn, *args, deadline=None, **kwargs):
+        """Await fn through the scheduler without blocking the event loop"""
+        return await asyncio.wrap_future(self.submit(priority, fn, *args, deadline=deadline, **kwargs))
+
+    def queue_depth(self, priority):
+        """Jobs queued that will run no later than a new job of this priority"""
+        with self._condition:
+            return sum(self._stats[p].queued for p in PRIORITY_NAMES if p <= priority)
+
+    def _worker(self):
+        while True:
+            with self._condition:
+                while self._running and not self._heap:
+                    self._condition.wait()
+                if not self._running:
+                    return
+                priority, _, _, job = heapq.heappop(self._heap)
+                stats = self._stats[priority]
+                stats.queued -= 1
+                if priority != BATCH and self._stats[BATCH].queued:
+                    # Queued batch work yields to this job at a frame boundary
+                    self.preemptions += 1
+
+            if not job.future.set_running_or_notify_cancel():
+                continue
+            start = time.perf_counter()
+            if job.deadline is not None and start > job.deadline:
+                stats.shed += 1
+                job.future.set_exception(DeadlineMissed(
+                    f"{PRIORITY_NAMES[priority]} job missed its deadline by "
+                    f"{1000 * (start - job.deadline):.1f} ms"))
+                continue
+
+            try:
+                result = job.fn(*job.args, **job.kwargs)
+            except Exception as e:
+                stats.failed += 1
+                job.future.set_exception(e)
+                continue
+            end = time.perf_counter()
+            stats.completed += 1
+            stats.waits.append(start - job.submitted_at)
+            stats.latencies.append(end - job.submitted_at)
+            job.future.set_result(result)
+
+    def stats(self):
+        with self._condition:
+            summary = {name: self._stats[priority].summary() for priority, name in PRIORITY_NAMES.items()}
+            summary["batch_preemptions"] = self.preemptions
+            return summary
+
+
+scheduler = InferenceScheduler()
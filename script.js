@@ -177,27 +177,22 @@ class SniperDetectionSystem {
     }
 
     loadModelPerformance() {
-        // Load performance metrics from results.csv
-        fetch('results.csv')
-            .then(response => response.text())
-            .then(data => {
-                const lines = data.split('\n');
-                const lastLine = lines[lines.length - 2]; // Last data line
-                if (lastLine) {
-                    const values = lastLine.split(',');
-                    if (values.length >= 14) {
-                        // Update metrics display
-                        const precision = (parseFloat(values[5]) * 100).toFixed(2);
-                        const recall = (parseFloat(values[6]) * 100).toFixed(2);
-                        const mAP50 = (parseFloat(values[7]) * 100).toFixed(2);
-                        const mAP50_95 = (parseFloat(values[8]) * 100).toFixed(2);
-
-                        document.querySelectorAll('.metric-card')[0].querySelector('.metric-value').textContent = mAP50 + '%';
-                        document.querySelectorAll('.metric-card')[1].querySelector('.metric-value').textContent = mAP50_95 + '%';
-                        document.querySelectorAll('.metric-card')[2].querySelector('.metric-value').textContent = precision + '%';
-                        document.querySelectorAll('.metric-card')[3].querySelector('.metric-value').textContent = recall + '%';
-                    }
-                }
+        // Load latest-epoch metrics from the cached metrics API
+        fetch('/api/metrics')
+            .then(response => {
+                if (!response.ok) throw new Error(`HTTP ${response.status}`);
+                return response.json();
+            })
+            .then(metrics => {
+                const precision = (metrics.precision * 100).toFixed(2);
+                const recall = (metrics.recall * 100).toFixed(2);
+                const mAP50 = (metrics.mAP50 * 100).toFixed(2);
+                const mAP50_95 = (metrics.mAP50_95 * 100).toFixed(2);
+
+                document.querySelectorAll('.metric-card')[0].querySelector('.metric-value').textContent = mAP50 + '%';
+                document.querySelectorAll('.metric-card')[1].querySelector('.metric-value').textContent = mAP50_95 + '%';
+                document.querySelectorAll('.metric-card')[2].querySelector('.metric-value').textContent = precision + '%';
+                document.querySelectorAll('.metric-card')[3].querySelector('.metric-value').textContent = recall + '%';
             })
             .catch(error => {
                 console.log('Could not load performance metrics:', error);
@@ -4,67 +4,248 @@ Simple HTTP server for the AI Sniper Detection System Interface
 """
 
 import http.server
-import socketserver
 import os
+import io
+import re
 import json
-import base64
-from urllib.parse import urlparse, parse_qs
+import time
+from urllib.parse import urlparse, parse_qs, unquote
 import mimetypes
 
+from assets import AssetPipeline, ThumbnailCache
+from cascade import create_cascade
+from config import MAX_FILE_SIZE, DETECTION_MODES
+from detector import Detector, decode_image
+from metrics import training_metrics
+
+CHUNK_SIZE = 64 * 1024
+MAX_HEADER_SIZE = 16 * 1024
+
+# Single shared model, serialized internally so handler threads can share it
+detector = Detector()
+cascade_detector = create_cascade(detector)
+
+# Top-level pages, scripts and plots are fingerprinted and precompressed in main()
+static_assets = AssetPipeline(os.getcwd(), recursive=False)
+thumbnails = ThumbnailCache(os.getcwd())
+
+
+class MultipartReader:
+    """Stream a multipart/form-data request body without buffering it whole"""
+
+    def __init__(self, rfile, content_type, content_length, chunk_size=CHUNK_SIZE):
+        match = re.search(r'boundary="?([^";]+)"?', content_type or '')
+        if not content_type or not content_type.startswith('multipart/form-data') or not match:
+            raise ValueError("Expected a multipart/form-data body")
+        self.rfile = rfile
+        self.delimiter = b'\r\n--' + match.group(1).encode('latin-1')
+        self.remaining = content_length
+        self.chunk_size = chunk_size
+        self.buffer = b''
+
+    def _fill(self):
+        """Read the next chunk of the body into the buffer"""
+        if self.remaining <= 0:
+            return False
+        chunk = self.rfile.read(min(self.chunk_size, self.remaining))
+        if not chunk:
+            self.remaining = 0
+            return False
+        self.remaining -= len(chunk)
+        self.buffer += chunk
+        return True
+
+    def _read_headers(self):
+        """Read and parse the headers of the next part"""
+        while b'\r\n\r\n' not in self.buffer:
+            if len(self.buffer) > MAX_HEADER_SIZE or not self._fill():
+                raise ValueError("Malformed multipart part headers")
+        raw, self.buffer = self.buffer.split(b'\r\n\r\n', 1)
+        headers = {}
+        for line in raw.decode('utf-8', 'replace').split('\r\n'):
+            if ':' in line:
+                key, value = line.split(':', 1)
+                headers[key.strip().lower()] = value.strip()
+        return headers
+
+    def read_parts(self, open_sink):
+        """Stream every part into the writer returned by open_sink(name, filename, headers)"""
+        # Prefix CRLF so the first boundary matches the same delimiter as the rest
+        self.buffer = b'\r\n'
+        while self.delimiter not in self.buffer:
+            if not self._fill():
+                raise ValueError("Multipart boundary not found")
+        self.buffer = self.buffer.split(self.delimiter, 1)[1]
+
+        while True:
+            while len(self.buffer) < 2 and self._fill():
+                pass
+            if self.buffer.startswith(b'--'):
+                return
+            if not self.buffer.startswith(b'\r\n'):
+                raise ValueError("Malformed multipart boundary")
+            self.buffer = self.buffer[2:]
+
+            headers = self._read_headers()
+            disposition = headers.get('content-disposition', '')
+            name = re.search(r'\bname="([^"]*)"', disposition)
+            filename = re.search(r'\bfilename="([^"]*)"', disposition)
+            sink = open_sink(name.group(1) if name else None,
+                             filename.group(1) if filename else None,
+                             headers)
+
+            keep = len(self.delimiter) - 1
+            while True:
+                index = self.buffer.find(self.delimiter)
+                if index >= 0:
+                    sink.write(self.buffer[:index])
+                    self.buffer = self.buffer[index + len(self.delimiter):]
+                    break
+                if len(self.buffer) > keep:
+                    sink.write(self.buffer[:-keep])
+                    self.buffer = self.buffer[-keep:]
+                if not self._fill():
+                    raise ValueError("Truncated multipart body")
+
+
+class LimitedBuffer(io.BytesIO):
+    """In-memory sink that refuses to grow past max_size bytes"""
+
+    def __init__(self, max_size):
+        super().__init__()
+        self.max_size = max_size
+
+    def write(self, data):
+        if self.tell() + len(data) > self.max_size:
+            raise ValueError(f"Upload exceeds {self.max_size} bytes")
+        return super().write(data)
+
+
 class SniperDetectionHandler(http.server.SimpleHTTPRequestHandler):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, directory=os.getcwd(), **kwargs)
     
     def do_GET(self):
         """Handle GET requests"""
+        parsed = urlparse(self.path)
         if self.path == '/':
             self.path = '/index.html'
-        elif self.path == '/api/metrics':
+            parsed = urlparse(self.path)
+        elif parsed.path == '/api/metrics':
             self.serve_metrics()
             return
-        elif self.path == '/api/model-info':
+        elif parsed.path == '/api/metrics/curves':
+            self.serve_metric_curves(parse_qs(parsed.query))
+            return
+        elif parsed.path == '/api/metrics/best':
+            self.serve_best_epoch(parse_qs(parsed.query))
+            return
+        elif parsed.path == '/api/model-info':
             self.serve_model_info()
             return
         
+        if self.serve_asset(parsed):
+            return
         super().do_GET()
+
+    def do_HEAD(self):
+        """Handle HEAD requests"""
+        if self.path == '/':
+            self.path = '/index.html'
+        if self.serve_asset(urlparse(self.path), head=True):
+            return
+        super().do_HEAD()
     
     def do_POST(self):
         """Handle POST requests for file uploads and detection"""
-        if self.path == '/api/detect':
-            self.handle_detection()
-        elif self.path == '/api/upload':
+        parsed = urlparse(self.path)
+        if parsed.path == '/api/detect':
+            self.handle_detection(parse_qs(parsed.query))
+        elif parsed.path == '/api/upload':
             self.handle_upload()
         else:
             self.send_error(404, "Not Found")
     
+    def send_json(self, payload, status=200):
+        """Send a JSON response"""
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def read_multipart(self, open_sink):
+        """Stream the multipart request body through open_sink"""
+        content_length = int(self.headers.get('Content-Length', 0))
+        reader = MultipartReader(self.rfile, self.headers.get('Content-Type'), content_length)
+        reader.read_parts(open_sink)
+
+    def serve_asset(self, parsed, head=False):
+        """Serve a precompressed asset or thumbnail, returning False if there is none"""
+        rel_path = unquote(parsed.path).lstrip('/')
+        query = parse_qs(parsed.query)
+        version = query.get('v', [None])[0]
+        if rel_path.startswith('thumbnails/'):
+            try:
+                width = int(query['w'][0]) if 'w' in query else None
+            except ValueError:
+                width = None
+            try:
+                response = thumbnails.respond(rel_path[len('thumbnails/'):], width,
+                                              version, self.headers, head)
+            except Exception as e:
+                self.send_error(500, f"Thumbnail error: {str(e)}")
+                return True
+        else:
+            response = static_assets.respond(rel_path, version, self.headers, head)
+        if response is None:
+            return False
+        self.send_response(response.status)
+        for key, value in response.headers.items():
+            self.send_header(key, value)
+        self.end_headers()
+        if isinstance(response.body, (bytes, bytearray, memoryview)):
+            if response.body:
+                self.wfile.write(response.body)
+        else:
+            for chunk in response.body:
+                self.wfile.write(chunk)
+        return True
+
     def serve_metrics(self):
-        """Serve model performance metrics"""
+        """Serve metrics for the latest training epoch"""
         try:
-            with open('results.csv', 'r') as f:
-                lines = f.readlines()
-                if len(lines) > 1:
-                    last_line = lines[-1].strip()
-                    values = last_line.split(',')
-                    
-                    metrics = {
-                        'precision': float(values[5]) if len(values) > 5 else 0,
-                        'recall': float(values[6]) if len(values) > 6 else 0,
-                        'mAP50': float(values[7]) if len(values) > 7 else 0,
-                        'mAP50_95': float(values[8]) if len(values) > 8 else 0,
-                        'epoch': int(values[0]) if len(values) > 0 else 0
-                    }
-                    
-                    self.send_response(200)
-                    self.send_header('Content-type', 'application/json')
-                    self.send_header('Access-Control-Allow-Origin', '*')
-                    self.end_headers()
-                    self.wfile.write(json.dumps(metrics).encode())
-                else:
-                    self.send_error(404, "No metrics found")
+            self.send_json(training_metrics.latest())
+        except (FileNotFoundError, LookupError):
+            self.send_error(404, "No metrics found")
+        except Exception as e:
+            self.send_error(500, f"Error reading metrics: {str(e)}")
+
+    def serve_metric_curves(self, query):
+        """Serve per-epoch training curves, optionally downsampled with ?points=N"""
+        try:
+            names = [name for value in query.get('metrics', []) for name in value.split(',') if name]
+            points = int(query['points'][0]) if 'points' in query else None
+            self.send_json(training_metrics.curves(names, points))
+        except (KeyError, ValueError) as e:
+            self.send_error(400, str(e))
         except FileNotFoundError:
             self.send_error(404, "Metrics file not found")
         except Exception as e:
             self.send_error(500, f"Error reading metrics: {str(e)}")
+
+    def serve_best_epoch(self, query):
+        """Serve a summary of the best training epoch"""
+        try:
+            metric = query.get('metric', ['mAP50_95'])[0]
+            self.send_json(training_metrics.best(metric))
+        except (KeyError, ValueError) as e:
+            self.send_error(400, str(e))
+        except (FileNotFoundError, LookupError):
+            self.send_error(404, "No metrics found")
+        except Exception as e:
+            self.send_error(500, f"Error reading metrics: {str(e)}")
     
     def serve_model_info(self):
         """Serve model information"""
@@ -85,84 +266,81 @@ class SniperDetectionHandler(http.server.SimpleHTTPRequestHandler):
         self.end_headers()
         self.wfile.write(json.dumps(model_info).encode())
     
-    def handle_detection(self):
-        """Handle detection requests"""
+    def handle_detection(self, query):
+        """Handle detection requests with a multipart image upload, ?mode=standard|cascade"""
+        mode = query.get('mode', ['standard'])[0]
+        if mode not in DETECTION_MODES:
+            self.send_error(400, f"Unknown detection mode '{mode}'")
+            return
+        active_detector = cascade_detector if mode == 'cascade' else detector
+        parts = {}
+
+        def open_sink(name, filename, headers):
+            parts[name] = LimitedBuffer(MAX_FILE_SIZE)
+            return parts[name]
+
+        try:
+            self.read_multipart(open_sink)
+        except ValueError as e:
+            self.send_error(400, f"Invalid upload: {str(e)}")
+            return
+
+        image = parts.get('file') or parts.get('image')
+        if image is None:
+            self.send_error(400, "Missing 'file' field")
+            return
+
         try:
-            content_length = int(self.headers['Content-Length'])
-            post_data = self.rfile.read(content_length)
-            data = json.loads(post_data.decode('utf-8'))
-            
-            # Simulate detection processing
-            # In a real implementation, this would load and run the actual model
-            results = self.simulate_detection(data)
-            
-            self.send_response(200)
-            self.send_header('Content-type', 'application/json')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
-            self.wfile.write(json.dumps(results).encode())
-            
+            decoded = decode_image(image.getbuffer())
+            start = time.perf_counter()
+            _, detections = active_detector.detect(decoded, annotate=False)
+            processing_time = (time.perf_counter() - start) * 1000
+        except ValueError as e:
+            self.send_error(400, str(e))
+            return
         except Exception as e:
             self.send_error(500, f"Detection error: {str(e)}")
-    
+            return
+
+        self.send_json({
+            'detections': detections,
+            'processing_time': round(processing_time, 1),
+            'mode': mode
+        })
+
     def handle_upload(self):
-        """Handle file uploads"""
+        """Handle multipart file uploads, streaming each file to disk"""
+        saved = []
+        handles = []
+
+        def open_sink(name, filename, headers):
+            if not filename:
+                # Plain form fields are ignored
+                handles.append(io.BytesIO())
+                return handles[-1]
+            filename = os.path.basename(filename) or 'uploaded_file'
+            handles.append(open(os.path.join('uploads', filename), 'wb'))
+            saved.append(filename)
+            return handles[-1]
+
         try:
-            content_length = int(self.headers['Content-Length'])
-            post_data = self.rfile.read(content_length)
-            data = json.loads(post_data.decode('utf-8'))
-            
-            # Save uploaded file
-            filename = data.get('filename', 'uploaded_file')
-            file_data = base64.b64decode(data.get('data', ''))
-            
-            with open(f'uploads/{filename}', 'wb') as f:
-                f.write(file_data)
-            
-            response = {'status': 'success', 'filename': filename}
-            
-            self.send_response(200)
-            self.send_header('Content-type', 'application/json')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
-            self.wfile.write(json.dumps(response).encode())
-            
+            self.read_multipart(open_sink)
+        except ValueError as e:
+            self.send_error(400, f"Invalid upload: {str(e)}")
+            return
         except Exception as e:
             self.send_error(500, f"Upload error: {str(e)}")
-    
-    def simulate_detection(self, data):
-        """Simulate AI detection results"""
-        # This is a placeholder - replace with actual model inference
-        import random
-        import time
-        
-        # Simulate processing time
-        time.sleep(0.5)
-        
-        # Generate mock detection results
-        num_detections = random.randint(0, 3)
-        results = []
-        
-        for i in range(num_detections):
-            result = {
-                'class': 'sniper',
-                'confidence': round(random.uniform(0.3, 0.95), 3),
-                'bbox': [
-                    random.randint(50, 400),  # x
-                    random.randint(50, 300),  # y
-                    random.randint(80, 150),  # width
-                    random.randint(100, 200)  # height
-                ],
-                'timestamp': time.time()
-            }
-            results.append(result)
-        
-        return {
-            'detections': results,
-            'processing_time': random.randint(100, 500),
-            'model_confidence': 0.85
-        }
-    
+            return
+        finally:
+            for handle in handles:
+                handle.close()
+
+        if not saved:
+            self.send_error(400, "No file in upload")
+            return
+
+        self.send_json({'status': 'success', 'filename': saved[0], 'files': saved})
+
     def end_headers(self):
         """Add CORS headers"""
         self.send_header('Access-Control-Allow-Origin', '*')
@@ -177,7 +355,15 @@ def main():
     # Create uploads directory if it doesn't exist
     os.makedirs('uploads', exist_ok=True)
     
-    with socketserver.TCPServer(("", PORT), SniperDetectionHandler) as httpd:
+    static_assets.build()
+
+    # Warm the model up front so the first request does not pay for loading
+    try:
+        detector.load()
+    except Exception as e:
+        print(f"Warning: model not loaded, /api/detect will retry on demand ({e})")
+
+    with http.server.ThreadingHTTPServer(("", PORT), SniperDetectionHandler) as httpd:
         print(f"AI Sniper Detection System Interface")
         print(f"Server running at http://localhost:{PORT}")
         print(f"Press Ctrl+C to stop the server")
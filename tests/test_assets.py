@@ -0,0 +1,94 @@
+import os
+
+import pytest
+
+from assets import AssetPipeline, StaticAsset, build_response, choose_encoding, parse_range
+
+DATA = bytes(range(256)) * 20
+
+
+def asset():
+    return StaticAsset(DATA, 'text/plain', 0.0, compress=True)
+
+
+def test_full_response_prefers_brotli_or_gzip():
+    response = build_response(asset(), None, {'Accept-Encoding': 'gzip'})
+    assert response.status == 200
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert response.headers['Vary'] == 'Accept-Encoding'
+
+
+def test_range_returns_206_with_identity_body():
+    response = build_response(asset(), None, {'Range': 'bytes=10-19', 'Accept-Encoding': 'gzip'})
+    assert response.status == 206
+    assert bytes(response.body) == DATA[10:20]
+    assert response.headers['Content-Range'] == f'bytes 10-19/{len(DATA)}'
+    assert 'Content-Encoding' not in response.headers
+
+
+def test_suffix_range():
+    response = build_response(asset(), None, {'Range': 'bytes=-5'})
+    assert response.status == 206
+    assert bytes(response.body) == DATA[-5:]
+
+
+def test_unsatisfiable_range_returns_416():
+    response = build_response(asset(), None, {'Range': f'bytes={len(DATA)}-'})
+    assert response.status == 416
+    assert response.headers['Content-Range'] == f'bytes */{len(DATA)}'
+
+
+def test_if_range_mismatch_ignores_range():
+    response = build_response(asset(), None, {'Range': 'bytes=0-9', 'If-Range': '"stale"'})
+    assert response.status == 200
+    assert len(response.body) == len(DATA)
+
+
+def test_matching_etag_returns_304():
+    current = asset()
+    etag = build_response(current, None, {}).headers['ETag']
+    response = build_response(current, None, {'If-None-Match': etag})
+    assert response.status == 304
+    assert response.body == b''
+
+
+def test_versioned_url_is_immutable():
+    current = asset()
+    assert 'immutable' in build_response(current, current.fingerprint, {}).headers['Cache-Control']
+    assert build_response(current, 'old', {}).headers['Cache-Control'] == 'no-cache'
+
+
+def test_parse_range_ignores_multiple_ranges():
+    assert parse_range('bytes=0-1,4-5', 10) is None
+    with pytest.raises(ValueError):
+        parse_range('bytes=5-2', 10)
+
+
+def test_choose_encoding_respects_q_zero():
+    assert choose_encoding('br;q=0, gzip', {'br': b'', 'gzip': b''}) == 'gzip'
+    assert choose_encoding('identity', {'gzip': b''}) is None
+
+
+def test_changed_file_is_rebuilt_and_pages_rewritten(tmp_path):
+    (tmp_path / 'style.css').write_text('body { color: red; }')
+    (tmp_path / 'index.html').write_text('<link href="style.css">')
+    pipeline = AssetPipeline(str(tmp_path)).build()
+    old = pipeline.assets['style.css'].fingerprint
+
+    (tmp_path / 'style.css').write_text('body { color: blue; }')
+    stat = os.stat(tmp_path / 'style.css')
+    os.utime(tmp_path / 'style.css', (stat.st_atime, stat.st_mtime + 5))
+    response = pipeline.respond('style.css', None, {})
+    assert bytes(response.body) == b'body { color: blue; }'
+
+    new = pipeline.assets['style.css'].fingerprint
+    assert new != old
+    page = bytes(pipeline.respond('index.html', None, {}).body)
+    assert f'style.css?v={new}'.encode() in page
+
+
+def test_deleted_file_is_no_longer_served(tmp_path):
+    (tmp_path / 'data.json').write_text('{}')
+    pipeline = AssetPipeline(str(tmp_path)).build()
+    os.remove(tmp_path / 'data.json')
+    assert pipeline.respond('data.json', None, {}) is None
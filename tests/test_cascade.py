@@ -0,0 +1,80 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("cv2")
+
+from cascade import CascadeDetector, MIN_VERIFY_CROP
+
+
+class StubDetector:
+    """Returns canned screen candidates, and one box at a fixed offset in every verify crop"""
+
+    def __init__(self, candidates, crop_box=(5, 6, 15, 16)):
+        self.candidates = candidates
+        self.crop_box = list(crop_box)
+        self.calls = []
+
+    def detect_batch(self, images, confidence_threshold=0.5, **kwargs):
+        self.calls.append({"shapes": [image.shape for image in images],
+                           "confidence_threshold": confidence_threshold, **kwargs})
+        if len(self.calls) == 1:
+            return [[dict(c) for c in self.candidates] for _ in images]
+        return [[{"bbox": list(self.crop_box), "confidence": 0.9, "class": "sniper"}] for _ in images]
+
+
+def frame(height=480, width=640):
+    return np.zeros((height, width, 3), dtype=np.uint8)
+
+
+def candidate(x1, y1, x2, y2):
+    return {"bbox": [x1, y1, x2, y2], "confidence": 0.2, "class": "sniper"}
+
+
+def test_candidate_crop_is_padded_around_box():
+    cascade = CascadeDetector(StubDetector([]))
+    # 40x80 box, padded by half its larger side on every edge
+    assert cascade._candidate_crops([candidate(100, 100, 140, 180)], 480, 640) == [(40, 60, 200, 220)]
+
+
+def test_small_candidate_grows_to_minimum_crop():
+    cascade = CascadeDetector(StubDetector([]))
+    [(x1, y1, x2, y2)] = cascade._candidate_crops([candidate(300, 200, 304, 204)], 480, 640)
+    assert x2 - x1 == MIN_VERIFY_CROP
+    assert y2 - y1 == MIN_VERIFY_CROP
+
+
+def test_candidate_crops_are_clipped_at_frame_edges():
+    cascade = CascadeDetector(StubDetector([]))
+    assert cascade._candidate_crops([candidate(0, 0, 20, 20)], 480, 640) == [(0, 0, 90, 90)]
+    assert cascade._candidate_crops([candidate(620, 460, 640, 480)], 480, 640) == [(550, 390, 640, 480)]
+
+
+def test_overlapping_candidate_crops_are_merged():
+    cascade = CascadeDetector(StubDetector([]))
+    crops = cascade._candidate_crops([candidate(100, 100, 140, 180), candidate(150, 120, 190, 200)], 480, 640)
+    assert len(crops) == 1
+
+
+def test_verified_boxes_are_mapped_back_to_frame_coordinates():
+    stub = StubDetector([candidate(100, 100, 140, 180)])
+    cascade = CascadeDetector(stub)
+    [detections] = cascade.detect_batch([frame()])
+    # The crop starts at (40, 60); the stub reports (5, 6, 15, 16) inside it
+    assert [d["bbox"] for d in detections] == [[45, 66, 55, 76]]
+    assert stub.calls[1]["shapes"] == [(160, 160, 3)]
+
+
+def test_thresholds_are_passed_to_the_model():
+    stub = StubDetector([candidate(100, 100, 140, 180)])
+    cascade = CascadeDetector(stub, screen_threshold=0.1)
+    cascade.detect_batch([frame()], confidence_threshold=0.6)
+    screen, verify = stub.calls
+    assert screen["conf"] == 0.1 and screen["confidence_threshold"] == 0.1
+    assert verify["conf"] == 0.6 and verify["confidence_threshold"] == 0.6
+
+
+def test_frames_without_candidates_skip_verification():
+    stub = StubDetector([])
+    cascade = CascadeDetector(stub)
+    assert cascade.detect_batch([frame(), frame()]) == [[], []]
+    assert cascade.stats()["frames_screened_out"] == 2
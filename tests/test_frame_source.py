@@ -0,0 +1,159 @@
+import time
+
+import pytest
+
+np = pytest.importorskip("numpy")
+cv2 = pytest.importorskip("cv2")
+
+from frame_source import FramePool, FrameSource, scale_detections
+
+CLIP_SIZE = (64, 48)
+
+
+@pytest.fixture
+def clip(tmp_path):
+    """Path of a short synthetic 30 fps clip, written with cv2.VideoWriter"""
+    path = str(tmp_path / "clip.mp4")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), 30, CLIP_SIZE)
+    if not writer.isOpened():
+        pytest.skip("No mp4v encoder available")
+    for i in range(80):
+        writer.write(np.full((CLIP_SIZE[1], CLIP_SIZE[0], 3), 3 * i, np.uint8))
+    writer.release()
+    return path
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.perf_counter() + timeout
+    while not condition():
+        if time.perf_counter() > deadline:
+            return False
+        time.sleep(0.005)
+    return True
+
+
+class PacedCapture:
+    """Live capture stand-in whose grab() waits for the next frame like a camera"""
+
+    def __init__(self, interval=0.02, shape=(48, 64, 3)):
+        self.interval = interval
+        self.shape = shape
+
+    def isOpened(self):
+        return True
+
+    def grab(self):
+        time.sleep(self.interval)
+        return True
+
+    def retrieve(self, image=None):
+        if image is None:
+            image = np.empty(self.shape, np.uint8)
+        image.fill(0)
+        return True, image
+
+    def read(self, image=None):
+        return self.grab() and self.retrieve(image)
+
+
+def test_live_pacing_is_not_counted_as_decode_time():
+    source = FrameSource(PacedCapture(), queue_size=2, live=True).start()
+    time.sleep(0.3)
+    source.stop()
+    assert source.frames_decoded > 5
+    assert source.stats()["decode_utilization"] < 0.2
+
+
+def test_timed_out_polls_are_not_counted_as_busy():
+    source = FrameSource(PacedCapture(interval=0.05), queue_size=2, live=True).start()
+    start = time.perf_counter()
+    frames = 0
+    while time.perf_counter() - start < 0.4:
+        frame = source.read(timeout=0)
+        if frame is None:
+            time.sleep(0.005)
+            continue
+        frames += 1
+        frame.release()
+    source.stop()
+    assert frames > 2
+    # The consumer did no work between frames, so it was never busy
+    assert source.consumer_busy_time < 0.05
+
+
+def test_pool_reuses_released_buffers_up_to_capacity():
+    pool = FramePool(capacity=1)
+    first = pool.acquire((4, 4, 3))
+    second = pool.acquire((4, 4, 3))
+    pool.release(first)
+    pool.release(second)
+    assert pool.acquire((4, 4, 3)) is first
+    assert pool.acquire((2, 2, 3)) is not second
+    assert pool.stats()["allocations"] == 3
+    assert pool.stats()["reuses"] == 1
+
+
+def test_stop_unblocks_decoder_waiting_on_full_queue(clip):
+    source = FrameSource(cv2.VideoCapture(clip), queue_size=2).start()
+    assert wait_for(lambda: source.queue.full())
+    time.sleep(0.05)
+    # Nothing is reading, so the decoder is parked in _put
+    assert source._thread.is_alive()
+    source.stop()
+    assert not source._thread.is_alive()
+    assert source.frames_decoded < 80
+
+
+def test_live_source_drops_oldest_frames(clip):
+    source = FrameSource(cv2.VideoCapture(clip), queue_size=2, live=True).start()
+    assert wait_for(lambda: source.frames_decoded == 80)
+    assert source.frames_dropped == 78
+    assert [source.read(timeout=1).index, source.read(timeout=1).index] == [78, 79]
+    source.stop()
+
+
+def test_sample_rate_change_applies_mid_run(clip):
+    source = FrameSource(cv2.VideoCapture(clip), queue_size=1).start()
+    indices = []
+    for frame in source:
+        indices.append(frame.index)
+        frame.release()
+        if frame.index == 9:
+            source.sample_rate = 5
+    source.stop()
+    assert indices[:10] == list(range(10))
+    gaps = [b - a for a, b in zip(indices, indices[1:])]
+    # Frames already queued or being decoded keep the old rate
+    assert set(gaps[13:]) == {5}
+    assert source.frames_skipped == 80 - len(indices)
+
+
+def test_resize_to_reports_scale(clip):
+    source = FrameSource(cv2.VideoCapture(clip), resize_to=32).start()
+    frame = source.read(timeout=1)
+    source.stop()
+    assert frame.scale == 0.5
+    assert frame.image.shape == (24, 32, 3)
+    [detection] = scale_detections([{"bbox": [2, 4, 10, 12]}], frame.scale)
+    assert detection["bbox"] == [4, 8, 20, 24]
+
+    source = FrameSource(cv2.VideoCapture(clip), resize_to=640).start()
+    frame = source.read(timeout=1)
+    source.stop()
+    assert frame.scale == 1.0
+    assert frame.image.shape == (48, 64, 3)
+
+
+def test_frames_are_decoded_into_reused_buffers(clip):
+    source = FrameSource(cv2.VideoCapture(clip), queue_size=2).start()
+    buffers = set()
+    for frame in source:
+        buffers.add(id(frame.image))
+        frame.release()
+    source.stop()
+    stats = source.pool.stats()
+    # Only the first frame is decoded without a buffer; later ones go into pooled arrays
+    assert source.frames_decoded == 80
+    assert stats["allocations"] <= source.pool.capacity + 1
+    assert stats["reuses"] >= 80 - stats["allocations"]
+    assert len(buffers) <= stats["allocations"]
@@ -0,0 +1,60 @@
+import os
+
+import pytest
+
+from metrics import TrainingMetrics, downsample_indices
+
+HEADER = "epoch,time,metrics/mAP50-95(B),val/box_loss,lr/pg0\n"
+
+
+def write_csv(tmp_path, rows):
+    path = tmp_path / "results.csv"
+    path.write_text(HEADER + "".join(rows))
+    return str(path)
+
+
+def test_best_maximises_quality_metrics(tmp_path):
+    path = write_csv(tmp_path, ["1,10,0.2,1.5,0.01\n", "2,20,0.5,1.9,0.01\n", "3,30,0.4,1.1,0.01\n"])
+    assert TrainingMetrics(path).best("mAP50_95")["best_epoch"] == 2
+
+
+def test_best_minimises_losses(tmp_path):
+    path = write_csv(tmp_path, ["1,10,0.2,1.5,0.01\n", "2,20,0.5,1.9,0.01\n", "3,30,0.4,1.1,0.01\n"])
+    assert TrainingMetrics(path).best("val_box_loss")["best_epoch"] == 3
+
+
+@pytest.mark.parametrize("metric", ["epoch", "time", "lr"])
+def test_best_rejects_run_columns(tmp_path, metric):
+    path = write_csv(tmp_path, ["1,10,0.2,1.5,0.01\n"])
+    with pytest.raises(ValueError):
+        TrainingMetrics(path).best(metric)
+
+
+def test_best_rejects_unknown_metric(tmp_path):
+    path = write_csv(tmp_path, ["1,10,0.2,1.5,0.01\n"])
+    with pytest.raises(KeyError):
+        TrainingMetrics(path).best("accuracy")
+
+
+def test_partial_and_malformed_rows_are_skipped(tmp_path):
+    path = write_csv(tmp_path, ["1,10,0.2,1.5,0.01\n", "2,20,,1.9,0.01\n", "3,30,0.4,1.1,0.01\n", "4,40,0.6"])
+    metrics = TrainingMetrics(path)
+    assert metrics.latest()["epoch"] == 3
+    assert metrics.curves(["mAP50_95"])["curves"]["epoch"] == [1, 3]
+
+
+def test_reparses_when_file_changes(tmp_path):
+    path = write_csv(tmp_path, ["1,10,0.2,1.5,0.01\n"])
+    metrics = TrainingMetrics(path)
+    assert metrics.latest()["epoch"] == 1
+    with open(path, "a") as f:
+        f.write("2,20,0.3,1.4,0.01\n")
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert metrics.latest()["epoch"] == 2
+
+
+def test_downsample_keeps_first_and_last():
+    indices = downsample_indices(100, 5)
+    assert indices[0] == 0 and indices[-1] == 99 and len(indices) == 5
+    assert downsample_indices(3, 10) == [0, 1, 2]
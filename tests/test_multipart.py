@@ -0,0 +1,74 @@
+import io
+
+import pytest
+
+pytest.importorskip("cv2")
+
+from server import LimitedBuffer, MultipartReader
+
+BOUNDARY = "----formboundary7MA4YWxk"
+
+
+def body(parts):
+    chunks = []
+    for name, filename, data in parts:
+        disposition = f'form-data; name="{name}"'
+        if filename:
+            disposition += f'; filename="{filename}"'
+        chunks.append(f"--{BOUNDARY}\r\nContent-Disposition: {disposition}\r\n\r\n".encode() + data + b"\r\n")
+    chunks.append(f"--{BOUNDARY}--\r\n".encode())
+    return b"".join(chunks)
+
+
+def parse(raw, chunk_size):
+    reader = MultipartReader(io.BytesIO(raw), f"multipart/form-data; boundary={BOUNDARY}", len(raw), chunk_size)
+    parts = []
+
+    def open_sink(name, filename, headers):
+        sink = io.BytesIO()
+        parts.append((name, filename, sink))
+        return sink
+
+    reader.read_parts(open_sink)
+    return [(name, filename, sink.getvalue()) for name, filename, sink in parts]
+
+
+# Payload full of near-misses of the delimiter
+PAYLOAD = b"\r\n--" + BOUNDARY[:-3].encode() + b"\r\n-\r\n--\x00\xff" * 20
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 16, 31, 64, 1024])
+def test_boundaries_split_across_chunks(chunk_size):
+    parts = [("file", "a.jpg", PAYLOAD), ("mode", None, b"cascade"), ("empty", None, b"")]
+    assert parse(body(parts), chunk_size) == parts
+
+
+def test_quoted_boundary_parameter():
+    raw = body([("file", "x.png", b"data")])
+    reader = MultipartReader(io.BytesIO(raw), f'multipart/form-data; boundary="{BOUNDARY}"', len(raw))
+    sinks = []
+    reader.read_parts(lambda name, filename, headers: sinks.append(io.BytesIO()) or sinks[-1])
+    assert sinks[0].getvalue() == b"data"
+
+
+def test_truncated_body_is_rejected():
+    raw = body([("file", "a.jpg", b"x" * 100)])
+    with pytest.raises(ValueError):
+        parse(raw[:-len(BOUNDARY) - 10], 16)
+
+
+def test_missing_boundary_is_rejected():
+    with pytest.raises(ValueError):
+        parse(b"no multipart here", 8)
+
+
+def test_non_multipart_content_type_is_rejected():
+    with pytest.raises(ValueError):
+        MultipartReader(io.BytesIO(b""), "application/json", 0)
+
+
+def test_limited_buffer_refuses_oversized_upload():
+    sink = LimitedBuffer(10)
+    sink.write(b"12345")
+    with pytest.raises(ValueError):
+        sink.write(b"123456")
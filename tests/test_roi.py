@@ -0,0 +1,100 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("cv2")
+
+from roi import CROP_PADDING, CameraROI, ROIManager, merge_rects
+
+
+class StubDetector:
+    """Returns the given crop-relative boxes for every crop and records the crop shapes"""
+
+    def __init__(self, boxes):
+        self.boxes = boxes
+        self.shapes = []
+
+    def detect_batch(self, images, **kwargs):
+        self.shapes = [image.shape[:2] for image in images]
+        return [[{"bbox": list(bbox), "confidence": 0.9, "class": "sniper"} for bbox in self.boxes]
+                for _ in images]
+
+
+def square(x1, y1, x2, y2):
+    return [[x1, y1], [x2, y1], [x2, y2], [x1, y2]]
+
+
+def frame(height=100, width=200):
+    return np.zeros((height, width, 3), np.uint8)
+
+
+def test_merge_rects_unions_overlaps_transitively():
+    merged = merge_rects([(0, 0, 10, 10), (8, 8, 20, 20), (18, 0, 30, 10), (50, 50, 60, 60)])
+    assert sorted(merged) == [(0, 0, 30, 20), (50, 50, 60, 60)]
+
+
+def test_merge_rects_keeps_touching_edges_apart():
+    assert merge_rects([(0, 0, 10, 10), (10, 0, 20, 10)]) == [(0, 0, 10, 10), (10, 0, 20, 10)]
+
+
+def test_region_crops_are_padded_and_clamped_to_the_frame():
+    roi = CameraROI(regions=[square(0, 0, 50, 50), square(180, 80, 199, 99)])
+    crops, _, _ = roi._layout(100, 200)
+    assert sorted(crops) == [(0, 0, 51 + CROP_PADDING, 51 + CROP_PADDING),
+                             (180 - CROP_PADDING, 80 - CROP_PADDING, 200, 100)]
+
+
+def test_crop_boxes_are_offset_to_frame_coordinates():
+    detector = StubDetector([(20, 20, 30, 30)])
+    roi = CameraROI(regions=[square(40, 40, 80, 80)])
+    _, detections = roi.detect(detector, frame(), annotate=False)
+    crop_origin = 40 - CROP_PADDING
+    assert detector.shapes == [(41 + 2 * CROP_PADDING, 41 + 2 * CROP_PADDING)]
+    assert [d["bbox"] for d in detections] == [[20 + crop_origin, 20 + crop_origin, 30 + crop_origin, 30 + crop_origin]]
+
+
+def test_boxes_are_kept_by_their_centre_point():
+    # Full-frame crop; one box centred in the exclusion, one only overlapping it
+    detector = StubDetector([(100, 40, 120, 60), (80, 40, 104, 60)])
+    roi = CameraROI(exclusions=[square(100, 0, 199, 99)])
+    _, detections = roi.detect(detector, frame(), annotate=False)
+    assert [d["bbox"] for d in detections] == [[80, 40, 104, 60]]
+
+
+def test_boxes_centred_in_crop_padding_are_outside_the_region():
+    # The crop starts at 24; (0, 0, 10, 10) maps to a centre of (29, 29), short of the region at 40
+    detector = StubDetector([(0, 0, 10, 10), (30, 30, 40, 40)])
+    roi = CameraROI(regions=[square(40, 40, 80, 80)])
+    _, detections = roi.detect(detector, frame(), annotate=False)
+    assert [d["bbox"] for d in detections] == [[54, 54, 64, 64]]
+
+
+def test_disabled_polygons_are_ignored():
+    roi = CameraROI(regions=[{"points": square(40, 40, 80, 80), "enabled": False}])
+    crops, region_mask, _ = roi._layout(100, 200)
+    assert crops == [(0, 0, 200, 100)]
+    assert region_mask is None
+
+
+def test_invalid_polygon_is_rejected():
+    with pytest.raises(ValueError):
+        CameraROI(regions=[[[0, 0], [1, 1]]])
+
+
+def test_manager_saves_and_loads_config(tmp_path):
+    path = str(tmp_path / "roi_config.json")
+    manager = ROIManager(path)
+    manager.set("cam1", {"regions": [square(0, 0, 50, 50)], "exclusions": [{"name": "sky", "points": square(0, 0, 10, 10)}]})
+    manager.set(2, {"regions": [square(10, 10, 20, 20)]})
+
+    loaded = ROIManager(path)
+    assert loaded.to_dict() == manager.to_dict()
+    assert loaded.get("cam1").exclusions[0]["name"] == "sky"
+    assert loaded.get(2) is not None
+
+    assert loaded.remove("cam1")
+    assert not loaded.remove("cam1")
+    assert ROIManager(path).get("cam1") is None
+
+
+def test_manager_ignores_missing_config(tmp_path):
+    assert ROIManager(str(tmp_path / "missing.json")).cameras == {}
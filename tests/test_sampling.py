@@ -0,0 +1,61 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("cv2")
+
+from sampling import AdaptiveSampler, SceneChangeSampler, frame_signature
+
+
+class Frame:
+    def __init__(self, index, image):
+        self.index = index
+        self.signature = frame_signature(image)
+
+
+def background():
+    rng = np.random.default_rng(0)
+    return rng.integers(60, 200, (360, 640, 3), dtype=np.uint8)
+
+
+def test_small_target_triggers_scene_change():
+    sampler = SceneChangeSampler(30)
+    empty = background()
+    target = empty.copy()
+    target[100:116, 300:312] = 0
+    assert sampler.select(Frame(0, empty)) == "first_frame"
+    assert sampler.select(Frame(1, empty)) is None
+    assert sampler.select(Frame(2, target)) == "scene_change"
+
+
+def test_static_scene_is_inferred_at_max_gap():
+    sampler = SceneChangeSampler(30, max_gap_seconds=1.0)
+    frame = background()
+    selected = [i for i in range(91) if sampler.select(Frame(i, frame))]
+    assert selected == [0, 30, 60, 90]
+
+
+def test_adaptive_interval_tracks_activity_and_load():
+    sampler = AdaptiveSampler(30, 2)
+    assert sampler.interval == 15
+    sampler.record(0.01, detections=1)
+    assert sampler.interval < 15
+    for _ in range(20):
+        sampler.record(0.01, detections=0)
+    assert sampler.interval > 15
+    for _ in range(20):
+        sampler.record(2.0, detections=1)
+    assert sampler.stats()["reason"] == "load"
+
+
+def test_dropped_frames_count_as_backlog_not_latency():
+    sampler = AdaptiveSampler(30, 2)
+    sampler.record(0.01, detections=1)
+    active_interval = sampler.interval
+    for _ in range(5):
+        sampler.record_drop(queue_depth=1)
+    stats = sampler.stats()
+    assert stats["samples"] == 1 and stats["dropped"] == 5
+    assert stats["latency_ms_avg"] == 10.0
+    assert stats["active"]
+    assert stats["reason"] == "backlog"
+    assert sampler.interval > active_interval
@@ -0,0 +1,77 @@
+import threading
+import time
+
+import pytest
+
+from scheduler import BATCH, INTERACTIVE, LIVE, DeadlineMissed, InferenceScheduler
+
+
+@pytest.fixture
+def scheduler():
+    scheduler = InferenceScheduler()
+    yield scheduler
+    scheduler.stop()
+
+
+def hold_worker(scheduler):
+    """Occupy the worker until the returned event is set, so later jobs queue up"""
+    started, release = threading.Event(), threading.Event()
+
+    def block():
+        started.set()
+        release.wait(5)
+
+    future = scheduler.submit(BATCH, block)
+    assert started.wait(5)
+    return release, future
+
+
+def test_runs_by_priority_then_deadline(scheduler):
+    release, blocker = hold_worker(scheduler)
+    order = []
+    far = time.perf_counter() + 60
+    futures = [
+        scheduler.submit(BATCH, order.append, "batch"),
+        scheduler.submit(INTERACTIVE, order.append, "interactive"),
+        scheduler.submit(LIVE, order.append, "live-late", deadline=far + 1),
+        scheduler.submit(LIVE, order.append, "live-early", deadline=far),
+    ]
+    release.set()
+    for future in [blocker] + futures:
+        future.result(5)
+    assert order == ["live-early", "live-late", "interactive", "batch"]
+    assert scheduler.stats()["batch_preemptions"] >= 1
+
+
+def test_expired_job_is_shed(scheduler):
+    release, _ = hold_worker(scheduler)
+    ran = []
+    future = scheduler.submit(LIVE, ran.append, 1, deadline=time.perf_counter() + 0.01)
+    time.sleep(0.05)
+    release.set()
+    with pytest.raises(DeadlineMissed):
+        future.result(5)
+    assert ran == []
+    assert scheduler.stats()["live"]["shed"] == 1
+
+
+def test_cancelled_job_is_skipped(scheduler):
+    release, _ = hold_worker(scheduler)
+    ran = []
+    future = scheduler.submit(INTERACTIVE, ran.append, 1)
+    assert future.cancel()
+    after = scheduler.submit(INTERACTIVE, ran.append, 2)
+    release.set()
+    after.result(5)
+    assert ran == [2]
+
+
+def test_exceptions_reach_the_caller(scheduler):
+    with pytest.raises(ZeroDivisionError):
+        scheduler.run(INTERACTIVE, lambda: 1 / 0)
+    assert scheduler.stats()["interactive"]["failed"] == 1
+
+
+def test_unknown_priority_is_rejected(scheduler):
+    with pytest.raises(ValueError):
+        scheduler.submit(7, print)
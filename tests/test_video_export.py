@@ -0,0 +1,69 @@
+import os
+import time
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("cv2")
+
+from video_export import AnnotatedVideoExporter, interpolate_detections, prune_exports
+
+
+def box(x1, y1, x2, y2, confidence=0.5):
+    return {"bbox": [x1, y1, x2, y2], "confidence": confidence}
+
+
+def test_matched_boxes_move_linearly():
+    [moved] = interpolate_detections([box(0, 0, 10, 10, 0.4)], [box(4, 0, 14, 10, 0.8)], 0.5)
+    assert moved["bbox"] == [2, 0, 12, 10]
+    assert moved["confidence"] == pytest.approx(0.6)
+
+
+def test_unmatched_boxes_are_held_for_the_nearer_half():
+    previous, following = [box(0, 0, 10, 10)], [box(100, 100, 110, 110)]
+    assert interpolate_detections(previous, following, 0.25) == previous
+    assert interpolate_detections(previous, following, 0.75) == following
+
+
+class Frame:
+    def __init__(self, index):
+        self.index = index
+        self.image = np.zeros((32, 32, 3), np.uint8)
+        self.released = False
+
+    def release(self):
+        self.released = True
+
+
+def test_frames_in_flight_are_bounded_and_every_frame_written(tmp_path):
+    exporter = AnnotatedVideoExporter(str(tmp_path / "out.mp4"), 30, max_frames=4)
+    frames = [Frame(i) for i in range(60)]
+    for frame in frames:
+        exporter.submit(frame, [box(1, 1, 8, 8)] if frame.index % 20 == 0 else None)
+    stats = exporter.close()
+    assert stats["frames_written"] == 60
+    assert stats["keyframes"] == 3
+    # Keyframes count too, and gaps longer than the bound are flushed early rather than deadlocking
+    assert stats["peak_frames_in_flight"] <= 4
+    assert stats["early_flushes"] > 0
+    assert all(frame.released for frame in frames)
+
+
+def test_short_keyframe_gaps_are_interpolated(tmp_path):
+    exporter = AnnotatedVideoExporter(str(tmp_path / "out.mp4"), 30, max_frames=8)
+    for i in range(13):
+        exporter.submit(Frame(i), [box(1, 1, 8, 8)] if i % 6 == 0 else None)
+    stats = exporter.close()
+    assert stats["interpolated_frames"] == 10
+    assert stats["early_flushes"] == 0
+
+
+def test_prune_exports_keeps_newest_within_age(tmp_path):
+    now = time.time()
+    for i, age_hours in enumerate([0, 1, 2, 48]):
+        path = tmp_path / f"annotated_{i}.mp4"
+        path.write_bytes(b"")
+        os.utime(path, (now - age_hours * 3600, now - age_hours * 3600))
+    (tmp_path / "notes.txt").write_text("kept")
+    assert prune_exports(str(tmp_path), 24, 2) == 2
+    assert sorted(os.listdir(tmp_path)) == ["annotated_0.mp4", "annotated_1.mp4", "notes.txt"]
@@ -0,0 +1,228 @@
+"""
+Annotated video export written by a background encoder thread
+"""
+
+import os
+import queue
+import threading
+import time
+
+import cv2
+
+from detector import draw_detections
+
+# Minimum overlap for a box on one keyframe to be the same target on the next
+MATCH_IOU = 0.3
+# Frames queued or held by the writer before submit() waits for it to catch up
+MAX_IN_FLIGHT = 32
+
+
+def _iou(a, b):
+    x1, y1 = max(a[0], b[0]), max(a[1], b[1])
+    x2, y2 = min(a[2], b[2]), min(a[3], b[3])
+    intersection = max(0, x2 - x1) * max(0, y2 - y1)
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - intersection
+    return intersection / union if union > 0 else 0.0
+
+
+def interpolate_detections(previous, following, t):
+    """Boxes at fraction t between two keyframes' detections
+
+    Boxes matched by overlap move linearly; unmatched boxes are held for the
+    half of the gap closest to the keyframe they were seen on.
+    """
+    interpolated = []
+    unmatched = list(following)
+    for detection in previous:
+        match = max(unmatched, key=lambda d: _iou(detection["bbox"], d["bbox"]), default=None)
+        if match is not None and _iou(detection["bbox"], match["bbox"]) >= MATCH_IOU:
+            unmatched.remove(match)
+            interpolated.append({
+                "bbox": [int(round(a + (b - a) * t)) for a, b in zip(detection["bbox"], match["bbox"])],
+                "confidence": detection["confidence"] + (match["confidence"] - detection["confidence"]) * t
+            })
+        elif t < 0.5:
+            interpolated.append(detection)
+    if t >= 0.5:
+        interpolated.extend(unmatched)
+    return interpolated
+
+
+def prune_exports(directory, max_age_hours, max_files):
+    """Delete exports older than max_age_hours and all but the newest max_files, returning the count"""
+    now = time.time()
+    exports = sorted((entry for entry in os.scandir(directory) if entry.is_file() and entry.name.endswith(".mp4")),
+                     key=lambda entry: entry.stat().st_mtime, reverse=True)
+    removed = 0
+    for i, entry in enumerate(exports):
+        if i >= max_files or now - entry.stat().st_mtime > max_age_hours * 3600:
+            try:
+                os.remove(entry.path)
+                removed += 1
+            except OSError:
+                pass
+    return removed
+
+
+class AnnotatedVideoExporter:
+    """Annotate and encode every frame of a video on a writer thread
+
+    Frames between two sampled keyframes are held until the later keyframe's
+    detections arrive, then drawn with interpolated boxes. At most max_frames
+    frames are queued or held at once, so memory is bounded at max_frames
+    full-size images; once that many are in flight, submit() waits for the
+    writer. An encoder slower than inference therefore stalls the inference
+    loop, and decoding behind it; submit_wait_ms reports for how long. If a
+    keyframe gap is longer than max_frames, the held frames are written early
+    with the earlier keyframe's boxes instead of interpolated ones.
+    Frames are DecodedFrames and are released back to their pool once written.
+    """
+
+    def __init__(self, path, fps, max_frames=MAX_IN_FLIGHT):
+        self.path = path
+        self.fps = fps if fps > 0 else 30
+        self.max_frames = max_frames
+        self.queue = queue.Queue()
+        self._slots = threading.Semaphore(max_frames)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self.backend = None
+        self._writer = None
+        self._pending = []
+        self._keyframe = None
+        self.error = None
+
+        self.frames_written = 0
+        self.keyframes = 0
+        self.interpolated_frames = 0
+        self.early_flushes = 0
+        self.peak_in_flight = 0
+        self.encode_time = 0.0
+        self.submit_wait_time = 0.0
+
+        self._thread = threading.Thread(target=self._run, name="video-exporter", daemon=True)
+        self._thread.start()
+
+    def submit(self, frame, detections=None):
+        """Queue a frame, waiting while max_frames are in flight; detections are given for keyframes only"""
+        start = time.perf_counter()
+        self._slots.acquire()
+        self.submit_wait_time += time.perf_counter() - start
+        with self._lock:
+            self._in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self._in_flight)
+        self.queue.put((frame, detections))
+
+    def _release(self, frame):
+        """Hand a written or discarded frame back to its pool and free its slot"""
+        frame.release()
+        with self._lock:
+            self._in_flight -= 1
+        self._slots.release()
+
+    def close(self):
+        """Flush remaining frames and wait for the encoder to finish"""
+        self.queue.put(None)
+        self._thread.join()
+        if self.error is not None:
+            raise RuntimeError(f"Video export failed: {self.error}")
+        return self.stats()
+
+    def _open(self, width, height):
+        """Prefer browser-playable H.264 through moviepy's ffmpeg writer, else OpenCV mp4v"""
+        try:
+            from moviepy.video.io.ffmpeg_writer import FFMPEG_VideoWriter
+            writer = FFMPEG_VideoWriter(self.path, (width, height), self.fps,
+                                        codec="libx264", preset="veryfast")
+            # moviepy expects RGB; the reversed-channel view is copied once by ffmpeg's pipe
+            self._write = lambda image: writer.write_frame(image[:, :, ::-1])
+            self._writer = writer
+            self.backend = "ffmpeg-libx264"
+        except Exception:
+            writer = cv2.VideoWriter(self.path, cv2.VideoWriter_fourcc(*"mp4v"), self.fps, (width, height))
+            if not writer.isOpened():
+                raise IOError(f"Could not open video writer for {self.path}")
+            self._write = writer.write
+            self._writer = writer
+            self.backend = "opencv-mp4v"
+
+    def _emit(self, frame, detections):
+        try:
+            image = frame.image
+            if self._writer is None:
+                height, width = image.shape[:2]
+                self._open(width, height)
+            start = time.perf_counter()
+            # The frame is not used after export, so annotate it in place
+            self._write(draw_detections(image, detections))
+            self.encode_time += time.perf_counter() - start
+            self.frames_written += 1
+        finally:
+            self._release(frame)
+
+    def _flush(self, following=None, following_index=None):
+        """Write held frames, interpolating towards the following keyframe if there is one"""
+        previous_index, previous = self._keyframe or (None, [])
+        while self._pending:
+            # Taken off the list before writing, so a failed write is not released twice
+            frame = self._pending.pop(0)
+            if following is None or previous_index is None:
+                detections = previous if following is None else []
+            else:
+                t = (frame.index - previous_index) / max(following_index - previous_index, 1)
+                detections = interpolate_detections(previous, following, t)
+            self._emit(frame, detections)
+            self.interpolated_frames += 1
+
+    def _run(self):
+        closed = False
+        try:
+            while True:
+                item = self.queue.get()
+                if item is None:
+                    closed = True
+                    self._flush()
+                    break
+                frame, detections = item
+                if detections is None:
+                    self._pending.append(frame)
+                    if len(self._pending) >= self.max_frames:
+                        # Every slot is held here, so the next keyframe could never be submitted
+                        self.early_flushes += 1
+                        self._flush()
+                    continue
+                self._flush(detections, frame.index)
+                self._emit(frame, detections)
+                self.keyframes += 1
+                self._keyframe = (frame.index, detections)
+        except Exception as e:
+            self.error = e
+            # Keep draining until close() so pooled buffers are not stranded
+            for frame in self._pending:
+                self._release(frame)
+            self._pending = []
+            while not closed:
+                item = self.queue.get()
+                if item is None:
+                    closed = True
+                else:
+                    self._release(item[0])
+        finally:
+            if self._writer is not None:
+                if self.backend == "opencv-mp4v":
+                    self._writer.release()
+                else:
+                    self._writer.close()
+
+    def stats(self):
+        return {
+            "file": os.path.basename(self.path),
+            "backend": self.backend,
+            "frames_written": self.frames_written,
+            "keyframes": self.keyframes,
+            "interpolated_frames": self.interpolated_frames,
+            "early_flushes": self.early_flushes,
+            "peak_frames_in_flight": self.peak_in_flight,
+            "submit_wait_ms": round(1000 * self.submit_wait_time, 1),
+            "encode_ms_per_frame": round(1000 * self.encode_time / max(self.frames_written, 1), 2)
+        }
@@ -0,0 +1,174 @@
+"""
+Virtual cameras that replay video files or image folders as live feeds
+"""
+
+import os
+import random
+import time
+
+import cv2
+import numpy as np
+
+from config import VIRTUAL_CAMERA_FPS
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.webp'}
+
+
+def resolve_source(source):
+    """Absolute path of a replay source, which must exist under the working directory"""
+    root = os.path.realpath(os.getcwd())
+    path = os.path.realpath(os.path.join(root, source))
+    if os.path.commonpath([root, path]) != root:
+        raise ValueError("Virtual camera source must be inside the working directory")
+    if not os.path.exists(path):
+        raise ValueError(f"Virtual camera source not found: {source}")
+    return path
+
+
+class VirtualCapture:
+    """Stand-in for cv2.VideoCapture that replays a video file or image folder
+
+    read() and grab() block until the next frame is due at fps * speed, shifted
+    by up to jitter_ms either way, and a drop_rate fraction of frames is lost as
+    a real camera would lose them. Playback loops forever; start_fraction starts
+    part-way through so several feeds of one source are not in lockstep.
+    """
+
+    def __init__(self, source, fps=None, speed=1.0, jitter_ms=0.0, drop_rate=0.0, start_fraction=0.0, seed=None):
+        self.source = source
+        self._capture = None
+        self._images = None
+        self._position = 0
+        if os.path.isdir(source):
+            self._images = sorted(os.path.join(source, name) for name in os.listdir(source)
+                                  if os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS)
+            if not self._images:
+                raise ValueError(f"No images found in {source}")
+            self.frame_count = len(self._images)
+            native_fps = None
+            first = cv2.imread(self._images[0])
+            self._size = (first.shape[1], first.shape[0]) if first is not None else (0, 0)
+        else:
+            self._capture = cv2.VideoCapture(source)
+            if not self._capture.isOpened():
+                raise ValueError(f"Could not open video {source}")
+            self.frame_count = int(self._capture.get(cv2.CAP_PROP_FRAME_COUNT))
+            native_fps = self._capture.get(cv2.CAP_PROP_FPS)
+            self._size = (int(self._capture.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                          int(self._capture.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+
+        self.fps = fps or native_fps or VIRTUAL_CAMERA_FPS
+        self.speed = speed
+        self.jitter = jitter_ms / 1000
+        self.drop_rate = drop_rate
+        self._random = random.Random(seed)
+        self._next_due = None
+        self._current = None
+        self._opened = True
+
+        if self.frame_count > 0 and start_fraction:
+            self._position = int(start_fraction * self.frame_count) % self.frame_count
+            if self._capture is not None:
+                self._capture.set(cv2.CAP_PROP_POS_FRAMES, self._position)
+
+        self.frames_delivered = 0
+        self.frames_dropped = 0
+        self.loops = 0
+        self.late_time = 0.0
+
+    def isOpened(self):
+        return self._opened
+
+    def release(self):
+        self._opened = False
+        if self._capture is not None:
+            self._capture.release()
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FPS:
+            # Frames per second of wall time, as a live camera would report
+            return self.fps * self.speed
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return self._size[0]
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return self._size[1]
+        if prop == cv2.CAP_PROP_FRAME_COUNT:
+            return self.frame_count
+        return 0
+
+    def set(self, prop, value):
+        """Device properties cannot be changed on a replay"""
+        return False
+
+    def _wait(self):
+        """Sleep until the next frame is due"""
+        interval = 1.0 / (self.fps * self.speed)
+        now = time.perf_counter()
+        if self._next_due is None or now - self._next_due > interval:
+            # A reader that fell behind resumes on a fresh clock instead of bursting
+            if self._next_due is not None:
+                self.late_time += now - self._next_due
+            self._next_due = now
+        due = self._next_due + self._random.uniform(-self.jitter, self.jitter)
+        if due > now:
+            time.sleep(due - now)
+        self._next_due += interval
+
+    def _advance(self):
+        """Move to the next source frame, looping at the end"""
+        if self._images is not None:
+            self._current = self._images[self._position]
+            self._position = (self._position + 1) % len(self._images)
+            if self._position == 0:
+                self.loops += 1
+            return True
+        if self._capture.grab():
+            return True
+        self._capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+        self.loops += 1
+        return self._capture.grab()
+
+    def grab(self):
+        """Wait for the next delivered frame without decoding it"""
+        if not self._opened:
+            return False
+        while True:
+            self._wait()
+            if not self._advance():
+                return False
+            if self.drop_rate and self._random.random() < self.drop_rate:
+                self.frames_dropped += 1
+                continue
+            self.frames_delivered += 1
+            return True
+
+    def retrieve(self, image=None):
+        """Decode the grabbed frame, into image if it has the right shape"""
+        if self._capture is not None:
+            return self._capture.retrieve(image) if image is not None else self._capture.retrieve()
+        frame = cv2.imread(self._current)
+        if frame is None:
+            return False, None
+        if image is not None and image.shape == frame.shape:
+            np.copyto(image, frame)
+            frame = image
+        return True, frame
+
+    def read(self, image=None):
+        if not self.grab():
+            return False, None
+        return self.retrieve(image)
+
+    def stats(self):
+        return {
+            "source": os.path.basename(self.source.rstrip(os.sep)),
+            "fps": round(self.fps * self.speed, 2),
+            "speed": self.speed,
+            "jitter_ms": round(self.jitter * 1000, 2),
+            "drop_rate": self.drop_rate,
+            "frames_delivered": self.frames_delivered,
+            "frames_dropped": self.frames_dropped,
+            "loops": self.loops,
+            # Time the reader was behind schedule, e.g. while inference or the host was saturated
+            "late_ms": round(1000 * self.late_time, 1)
+        }